@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Mixpanel raw export endpoint.
+
+Serves /api/2.0/export/ as streamed NDJSON with synthetic, seed-stable
+events so the Mixpanel code paths can be load-tested offline. Volume,
+latency, chunking, failures, gzip and `where` filter handling are configurable:
+
+    python benchmarks/mixpanel_stub.py --events-per-user 50000 --latency-ms 300 --error-rate 0.05
+    export USE_MIXPANEL=true MIXPANEL_API_SECRET=stub
+    export MIXPANEL_EXPORT_URL=http://127.0.0.1:8765/api/2.0/export/
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import threading
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from typing import Iterator, List, Optional, Union
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from config.settings import settings
+from src.analysis_engine import MOCK_TAGS, MOCK_TOOLS
+from src.event_batch import EPOCH
+from src.user_directory import USER_ID_COLUMN
+
+# Accepts both the JSON object the clients send and Mixpanel's expression syntax
+WHERE_EXPRESSION = re.compile(r'properties\["distinct_id"\]\s*==\s*"([^"]*)"')
+
+
+def parse_where(where: Optional[str]) -> Optional[str]:
+    """distinct_id selected by a `where` parameter, or None for an unfiltered export."""
+    if not where:
+        return None
+    try:
+        condition = json.loads(where)
+        if isinstance(condition, dict):
+            user_id = condition.get('properties["distinct_id"]')
+            return str(user_id) if user_id is not None else None
+    except ValueError:
+        pass
+    match = WHERE_EXPRESSION.search(where)
+    return match.group(1) if match else None
+
+
+def iter_user_lines(
+    user_id: str, from_day: date, to_day: date, event_names: List[str], total_events: int, seed: Union[int, str]
+) -> Iterator[str]:
+    """One user's export in time order; the same arguments always produce the same lines."""
+    rng = random.Random(f"{seed}:{user_id}")
+    start = datetime.combine(from_day, time.min)
+    span = (datetime.combine(to_day, time.max) - start).total_seconds()
+    step = span / max(total_events, 1)
+    for i in range(total_events):
+        tag_start = rng.randrange(len(MOCK_TAGS))
+        tool_start = rng.randrange(len(MOCK_TOOLS))
+        timestamp = start + timedelta(seconds=step * i + rng.random() * step)
+        yield json.dumps({
+            "event": rng.choice(event_names),
+            "properties": {
+                "distinct_id": user_id,
+                "time": int((timestamp - EPOCH).total_seconds()),
+                "tutorial_id": f"tutorial_{rng.randrange(500)}",
+                "tags": MOCK_TAGS[tag_start:tag_start + rng.randint(1, 3)],
+                "tools": MOCK_TOOLS[tool_start:tool_start + rng.randint(0, 2)],
+            },
+        }) + "\n"
+
+
+def iter_export_lines(
+    user_id: str, from_day: date, to_day: date, event_names: List[str], config: argparse.Namespace
+) -> Iterator[str]:
+    """--events-per-day generates each day on its own, so any split of a window returns the same lines."""
+    if not config.events_per_day:
+        yield from iter_user_lines(user_id, from_day, to_day, event_names, config.events_per_user, config.seed)
+        return
+    day = from_day
+    while day <= to_day:
+        yield from iter_user_lines(user_id, day, day, event_names, config.events_per_day, f"{config.seed}:{day}")
+        day += timedelta(days=1)
+
+
+class StubStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = Counter()
+
+    def add(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counts[name] += amount
+
+
+def create_app(config: argparse.Namespace) -> FastAPI:
+    app = FastAPI(title="Mixpanel export stand-in")
+    if config.gzip:
+        # Compresses when the client sends Accept-Encoding: gzip, like the real export API
+        app.add_middleware(GZipMiddleware, minimum_size=1000)
+    stats = StubStats()
+    rng = random.Random(config.seed)
+    all_users = config.user_ids or [f"stub-user-{i}" for i in range(config.users)]
+
+    @app.get("/stats")
+    async def get_stats():
+        return dict(stats.counts)
+
+    @app.get("/api/2.0/export/")
+    async def export(request: Request):
+        stats.add("requests")
+        if not request.headers.get("authorization"):
+            stats.add("unauthorized")
+            return JSONResponse({"error": "Missing authentication"}, status_code=401)
+
+        if config.latency_ms:
+            await asyncio.sleep(config.latency_ms / 1000)
+        if rng.random() < config.error_rate:
+            stats.add(f"status_{config.error_status}")
+            return JSONResponse({"error": "Injected failure"}, status_code=config.error_status)
+
+        params = request.query_params
+        try:
+            from_day = date.fromisoformat(params["from_date"])
+            to_day = date.fromisoformat(params["to_date"])
+        except (KeyError, ValueError):
+            stats.add("status_400")
+            return JSONResponse({"error": "from_date and to_date are required"}, status_code=400)
+        event_names = json.loads(params["event"]) if params.get("event") else settings.MIXPANEL_DEFAULT_EVENTS
+
+        user_id = parse_where(params.get("where"))
+        if user_id is not None and config.where == "honor":
+            users = [user_id]
+        else:
+            # Unfiltered export, or a server that ignores `where` and returns everyone
+            users = all_users
+        fail_midstream = rng.random() < config.midstream_error_rate
+
+        async def body():
+            chunk: List[str] = []
+            chunks_sent = 0
+            for export_user in users:
+                for line in iter_export_lines(export_user, from_day, to_day, event_names, config):
+                    chunk.append(line)
+                    if len(chunk) >= config.chunk_events:
+                        yield "".join(chunk)
+                        stats.add("lines", len(chunk))
+                        chunk = []
+                        chunks_sent += 1
+                        if fail_midstream and chunks_sent == 1:
+                            stats.add("midstream_failures")
+                            raise ConnectionError("Injected mid-stream failure")
+                        if config.chunk_delay_ms:
+                            await asyncio.sleep(config.chunk_delay_ms / 1000)
+            if chunk:
+                yield "".join(chunk)
+                stats.add("lines", len(chunk))
+
+        stats.add("status_200")
+        return StreamingResponse(body(), media_type="application/x-ndjson")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic Mixpanel raw export locally")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--events-per-user", type=int, default=1000, help="Events returned per user")
+    parser.add_argument("--events-per-day", type=int, default=0,
+                        help="Events per user and day instead of per export, independent of how the window is split")
+    parser.add_argument("--users", type=int, default=100, help="Synthetic users in unfiltered exports")
+    parser.add_argument("--users-csv", help="Take user IDs for unfiltered exports from a users.csv instead")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay before the response starts")
+    parser.add_argument("--chunk-events", type=int, default=500, help="NDJSON lines per streamed chunk")
+    parser.add_argument("--chunk-delay-ms", type=float, default=0, help="Delay between chunks")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of requests failing up front")
+    parser.add_argument("--error-status", type=int, default=503, help="Status code of injected failures")
+    parser.add_argument("--midstream-error-rate", type=float, default=0, help="Fraction of streams cut after the first chunk")
+    parser.add_argument("--where", choices=["honor", "ignore"], default="honor",
+                        help="Apply the distinct_id filter, or return every user like a misbehaving server")
+    parser.add_argument("--gzip", action="store_true", help="Gzip responses for clients that accept it")
+    parser.add_argument("--seed", type=int, default=42)
+    config = parser.parse_args()
+
+    config.user_ids = None
+    if config.users_csv:
+        config.user_ids = pd.read_csv(config.users_csv, usecols=[USER_ID_COLUMN])[USER_ID_COLUMN].astype(str).tolist()
+
+    print(f"🧪 Mixpanel stand-in on http://{config.host}:{config.port}/api/2.0/export/")
+    uvicorn.run(create_app(config), host=config.host, port=config.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
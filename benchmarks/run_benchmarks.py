@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""Reproducible performance benchmarks for the analysis engine and API.
+
+Workloads are synthetic: events come from the engine's mock generator
+under a pinned clock, and users.csv files are generated from a seeded RNG,
+so two runs on the same machine measure the same work. Results are written
+as JSON and can be compared against an earlier run with --compare.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+import numpy as np
+import pandas as pd
+
+from config.settings import settings
+from src.analysis_engine import MOCK_TAGS, MOCK_TOOLS, UserBehaviorAnalysisEngine
+from src.columnar_users import ColumnarUserDirectory, build_columnar_users
+from src.event_store import EventStore
+from src.tutorial_catalog import LIST_SEPARATOR, TutorialCatalog
+from src.user_directory import (
+    EMAIL_COLUMN,
+    NAME_COLUMN,
+    TOTAL_EVENTS_COLUMN,
+    USER_ID_COLUMN,
+    UserDirectory,
+)
+
+FIXED_NOW = datetime(2024, 1, 1, 12, 0, 0)
+
+PROFILES = {
+    "quick": {
+        "events": [100, 10_000],
+        "users": [1_000, 10_000],
+        "tutorials": [10_000],
+        "cohort": [1_000],
+        "requests": 50,
+        "startups": 3,
+    },
+    "default": {
+        "events": [100, 10_000, 100_000],
+        "users": [1_000, 100_000],
+        "tutorials": [10_000, 100_000],
+        "cohort": [1_000, 100_000],
+        "requests": 200,
+        "startups": 5,
+    },
+    "full": {
+        "events": [100, 10_000, 100_000, 1_000_000],
+        "users": [1_000, 100_000, 1_000_000],
+        "tutorials": [10_000, 100_000, 1_000_000],
+        "cohort": [1_000, 100_000, 1_000_000],
+        "requests": 500,
+        "startups": 10,
+    },
+}
+
+
+def fixed_clock() -> datetime:
+    return FIXED_NOW
+
+
+def write_users_csv(path: str, total_users: int, seed: int) -> List[str]:
+    rng = np.random.default_rng(seed)
+    high, low = rng.integers(0, 2 ** 62, size=(2, total_users), dtype=np.int64)
+    user_ids = [f"{a:016x}{b:016x}" for a, b in zip(high.tolist(), low.tolist())]
+    pd.DataFrame({
+        USER_ID_COLUMN: user_ids,
+        EMAIL_COLUMN: [f"user{i}@example.com" for i in range(total_users)],
+        NAME_COLUMN: [f"User {i}" for i in range(total_users)],
+        TOTAL_EVENTS_COLUMN: rng.integers(1, 500, size=total_users),
+    }).to_csv(path, index=False)
+    return user_ids
+
+
+def write_tutorials_csv(path: str, total_tutorials: int, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+
+    def item_lists(names: List[str], low: int, high: int) -> List[str]:
+        counts = rng.integers(low, high + 1, size=total_tutorials)
+        return [LIST_SEPARATOR.join(rng.choice(names, size=count, replace=False)) for count in counts.tolist()]
+
+    pd.DataFrame({
+        "id": [f"tutorial_{i}" for i in range(total_tutorials)],
+        "title": [f"Tutorial {i}" for i in range(total_tutorials)],
+        "tags": item_lists(MOCK_TAGS, 1, 4),
+        "tools": item_lists(MOCK_TOOLS, 0, 3),
+        "difficulty_level": rng.choice(["beginner", "intermediate", "advanced"], size=total_tutorials),
+        "category": rng.choice(["web", "data", "devops", "design"], size=total_tutorials),
+    }).to_csv(path, index=False)
+
+
+def measure(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Best and mean wall time over ``repeat`` runs, plus peak traced memory of one extra run."""
+    func()  # warm-up: imports, caches, allocator
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+
+    # tracemalloc slows allocation-heavy code, so memory is taken from a separate run
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"best_seconds": min(durations), "mean_seconds": statistics.fmean(durations), "peak_memory_bytes": peak}
+
+
+def result(name: str, params: Dict, timing: Dict[str, float], work: int, unit: str) -> Dict:
+    print(f"  {name} {params}: {timing['best_seconds'] * 1000:.2f} ms, "
+          f"{work / timing['best_seconds']:,.0f} {unit}/s, peak {timing['peak_memory_bytes'] / 1e6:.1f} MB")
+    return {
+        "name": name,
+        "params": params,
+        **timing,
+        "throughput": work / timing["best_seconds"],
+        "unit": f"{unit}/s",
+    }
+
+
+def bench_analyze(event_sizes: List[int]) -> List[Dict]:
+    print("\n📈 analyze_user_interests")
+    engine = UserBehaviorAnalysisEngine(clock=fixed_clock)
+    results = []
+    for total_events in event_sizes:
+        batch = engine.generate_mock_event_batch("bench-user", total_events)
+        repeat = max(1, min(20, 1_000_000 // total_events))
+        for backend in ("python", "numpy"):
+            engine.scoring_backend = backend
+            timing = measure(lambda: engine.analyze_user_interests("bench-user", batch), repeat)
+            results.append(result(
+                "analyze_user_interests", {"backend": backend, "events": total_events}, timing, total_events, "events"
+            ))
+    return results
+
+
+def bench_rollups(event_sizes: List[int], tmp_dir: str) -> List[Dict]:
+    """One heavy user scored from the event store's raw events and from its daily rollups."""
+    print("\n🗜️  Daily rollups")
+    engine = UserBehaviorAnalysisEngine(clock=fixed_clock)
+    results = []
+    for total_events in event_sizes:
+        events = sorted(engine.generate_mock_events("bench-user", total_events), key=lambda event: event.timestamp)
+        from_day, to_day = events[0].timestamp.date(), events[-1].timestamp.date()
+        store = EventStore(os.path.join(tmp_dir, f"event_store_{total_events}"))
+        store.replace_events("bench-user", from_day, to_day, events)
+        rows = store.row_counts()["daily_rollups"]
+        repeat = max(1, min(20, 1_000_000 // total_events))
+
+        timing = measure(
+            lambda: engine.analyze_event_stream("bench-user", store.iter_events("bench-user", from_day, to_day)), repeat
+        )
+        results.append(result("score_from_store", {"source": "events", "events": total_events}, timing, total_events, "events"))
+        timing = measure(
+            lambda: engine.analyze_rollups("bench-user", store.iter_rollups("bench-user", from_day, to_day), FIXED_NOW.date()),
+            repeat,
+        )
+        results.append(result(
+            "score_from_store", {"source": "rollups", "events": total_events, "rollup_rows": rows}, timing, total_events, "events"
+        ))
+    return results
+
+
+def bench_users(csv_paths: Dict[int, str], user_ids: Dict[int, List[str]], sample_size: int, seed: int) -> List[Dict]:
+    print("\n👥 get_user_interests / get_all_users_summary")
+    rng = np.random.default_rng(seed)
+    results = []
+    for total_users, path in csv_paths.items():
+        engine = UserBehaviorAnalysisEngine(clock=fixed_clock)
+        sample = rng.choice(user_ids[total_users], size=min(sample_size, total_users), replace=False).tolist()
+
+        timing = measure(lambda: UserDirectory(path).all_users(), repeat=3)
+        results.append(result("get_all_users_summary", {"users": total_users, "cache": "cold"}, timing, total_users, "users"))
+
+        columnar_dir = f"{path}.columnar"
+        build_columnar_users(path, columnar_dir)
+        for users_format, open_directory in (("csv", UserDirectory), ("columnar", ColumnarUserDirectory)):
+            source = path if users_format == "csv" else columnar_dir
+
+            def cold_lookups():
+                directory = open_directory(source)
+                for user_id in sample:
+                    directory.get(user_id)
+
+            timing = measure(cold_lookups, repeat=3)
+            results.append(result(
+                "user_lookup", {"users": total_users, "format": users_format, "cache": "cold"}, timing, len(sample), "lookups"
+            ))
+
+        engine.get_all_users_summary(path)
+        timing = measure(lambda: engine.get_all_users_summary(path), repeat=5)
+        results.append(result("get_all_users_summary", {"users": total_users, "cache": "warm"}, timing, total_users, "users"))
+
+        def cold_interests():
+            engine.result_cache.clear()
+            for user_id in sample:
+                engine.get_user_interests(user_id, path)
+
+        timing = measure(cold_interests, repeat=3)
+        results.append(result("get_user_interests", {"users": total_users, "cache": "cold"}, timing, len(sample), "requests"))
+
+        def warm_interests():
+            for user_id in sample:
+                engine.get_user_interests(user_id, path)
+
+        timing = measure(warm_interests, repeat=3)
+        results.append(result("get_user_interests", {"users": total_users, "cache": "warm"}, timing, len(sample), "requests"))
+    return results
+
+
+def bench_recommendations(tutorial_sizes: List[int], tmp_dir: str, seed: int) -> List[Dict]:
+    print("\n🎯 Tutorial recommendations")
+    engine = UserBehaviorAnalysisEngine(clock=fixed_clock)
+    batch = engine.generate_mock_event_batch("bench-user", 1_000)
+    profile = engine.analyze_user_interests("bench-user", batch)
+    completed = profile.completed_tutorials
+    results = []
+    for total_tutorials in tutorial_sizes:
+        path = os.path.join(tmp_dir, f"tutorials_{total_tutorials}.csv")
+        write_tutorials_csv(path, total_tutorials, seed)
+
+        timing = measure(lambda: TutorialCatalog(path).refresh(), repeat=3)
+        results.append(result("tutorial_catalog_load", {"tutorials": total_tutorials}, timing, total_tutorials, "tutorials"))
+
+        catalog = TutorialCatalog(path)
+        catalog.refresh()
+        timing = measure(lambda: catalog.recommend(profile, 10, exclude_ids=completed), repeat=20)
+        results.append(result("recommend", {"tutorials": total_tutorials, "limit": 10}, timing, 1, "requests"))
+    return results
+
+
+def bench_cohort(csv_paths: Dict[int, str], cohort_sizes: List[int]) -> List[Dict]:
+    """Full-population cohort queries; every size must also be in the profile's "users" list."""
+    print(f"\n👪 Cohort analytics ({settings.BATCH_SCORING_WORKERS} scoring workers)")
+    engine = UserBehaviorAnalysisEngine(clock=fixed_clock)
+    results = []
+    try:
+        for total_users in cohort_sizes:
+            path = csv_paths[total_users]
+            repeat = 1 if total_users >= 100_000 else 3
+            timing = measure(lambda: asyncio.run(engine.aget_cohort_analytics(path)), repeat)
+            results.append(result(
+                "cohort_analytics", {"users": total_users, "workers": settings.BATCH_SCORING_WORKERS}, timing, total_users, "users"
+            ))
+    finally:
+        asyncio.run(engine.aclose())
+    return results
+
+
+def bench_api(csv_path: str, user_ids: List[str], total_requests: int, seed: int) -> List[Dict]:
+    print("\n🌐 API latency (in-process)")
+    settings.CSV_FILE_PATH = csv_path
+    from fastapi.testclient import TestClient
+    from src import main
+
+    engine = main.create_analysis_engine()
+    engine.clock = fixed_clock
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(user_ids, size=total_requests, replace=True).tolist()
+
+    scenarios = {
+        "interests_cold": (lambda i: f"/interests/{sample[i]}", True),
+        "interests_warm": (lambda i: f"/interests/{sample[i % 10]}", False),
+        "users_page": (lambda i: "/users?limit=100", False),
+        "analytics_summary": (lambda i: "/analytics/summary", False),
+    }
+
+    results = []
+    with TestClient(main.app) as client:
+        client.get("/users")
+        for name, (path_for, clear_cache) in scenarios.items():
+            latencies = []
+            for i in range(total_requests):
+                if clear_cache:
+                    engine.result_cache.clear()
+                started = time.perf_counter()
+                response = client.get(path_for(i))
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{path_for(i)} returned {response.status_code}")
+            p50, p99 = np.percentile(latencies, [50, 99]).tolist()
+            print(f"  {name}: p50 {p50 * 1000:.2f} ms, p99 {p99 * 1000:.2f} ms")
+            results.append({
+                "name": f"api_{name}",
+                "params": {"users": len(user_ids), "requests": total_requests},
+                "p50_seconds": p50,
+                "p99_seconds": p99,
+                "mean_seconds": statistics.fmean(latencies),
+                "throughput": total_requests / sum(latencies),
+                "unit": "requests/s",
+            })
+    return results
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url: str, process: subprocess.Popen, timeout_seconds: float = 30.0) -> None:
+    deadline = time.perf_counter() + timeout_seconds
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with {process.returncode} before {url} answered")
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.005)
+    raise RuntimeError(f"{url} did not answer within {timeout_seconds}s")
+
+
+def bench_startup(csv_path: str, runs: int) -> List[Dict]:
+    """Cold-start latencies, each measured in a fresh interpreter from process launch."""
+    print("\n🚀 Startup (fresh process)")
+    env = {**os.environ, "CSV_FILE_PATH": csv_path, "PYTHONDONTWRITEBYTECODE": "1"}
+    scenarios = {
+        "import_api": "import src.main",
+        "import_engine": "from src.analysis_engine import UserBehaviorAnalysisEngine; UserBehaviorAnalysisEngine()",
+    }
+    durations: Dict[str, List[float]] = {name: [] for name in [*scenarios, "health_ready", "first_users_page"]}
+    for _ in range(runs):
+        for name, code in scenarios.items():
+            started = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, env=env, check=True)
+            durations[name].append(time.perf_counter() - started)
+
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=ROOT_DIR, env=env,
+        )
+        try:
+            wait_for(f"{base_url}/health", process)
+            durations["health_ready"].append(time.perf_counter() - started)
+            # The first engine request pays for building the engine and loading users.csv
+            with urllib.request.urlopen(f"{base_url}/users?limit=1", timeout=60) as response:
+                response.read()
+            durations["first_users_page"].append(time.perf_counter() - started)
+        finally:
+            process.terminate()
+            process.wait()
+
+    results = []
+    for name, timings in durations.items():
+        best, mean = min(timings), statistics.fmean(timings)
+        print(f"  {name}: best {best * 1000:.0f} ms, mean {mean * 1000:.0f} ms")
+        results.append({
+            "name": f"startup_{name}",
+            "params": {"runs": runs},
+            "best_seconds": best,
+            "mean_seconds": mean,
+            "throughput": runs / sum(timings),
+            "unit": "starts/s",
+        })
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return None
+
+
+def result_key(entry: Dict) -> str:
+    return entry["name"] + json.dumps(entry["params"], sort_keys=True)
+
+
+def compare(current: Dict, baseline_path: str, max_regression: Optional[float]) -> int:
+    with open(baseline_path) as f:
+        baseline = {result_key(entry): entry for entry in json.load(f)["results"]}
+
+    print(f"\n⚖️  Compared with {baseline_path} (throughput, higher is better)")
+    regressions = 0
+    for entry in current["results"]:
+        previous = baseline.get(result_key(entry))
+        if previous is None:
+            continue
+        ratio = entry["throughput"] / previous["throughput"]
+        marker = ""
+        if max_regression is not None and ratio < 1 / max_regression:
+            marker = "  ❌ regression"
+            regressions += 1
+        print(f"  {entry['name']} {entry['params']}: {ratio:.2f}x{marker}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the analysis engine and API")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="default", help="Workload sizes")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for synthetic users and request sampling")
+    parser.add_argument("--output", help="Results JSON (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, help="Exit non-zero if throughput drops by more than this factor")
+    parser.add_argument("--skip-api", action="store_true", help="Skip the API latency and startup benchmarks")
+    args = parser.parse_args()
+
+    profile = PROFILES[args.profile]
+    commit = git_commit()
+    print(f"🏁 Benchmark profile '{args.profile}' (seed {args.seed}, clock {FIXED_NOW.isoformat()})")
+
+    results = bench_analyze(profile["events"])
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_paths: Dict[int, str] = {}
+        user_ids: Dict[int, List[str]] = {}
+        for total_users in profile["users"]:
+            csv_paths[total_users] = os.path.join(tmp_dir, f"users_{total_users}.csv")
+            user_ids[total_users] = write_users_csv(csv_paths[total_users], total_users, args.seed)
+
+        results += bench_users(csv_paths, user_ids, profile["requests"], args.seed)
+        results += bench_rollups(profile["events"], tmp_dir)
+        results += bench_recommendations(profile["tutorials"], tmp_dir, args.seed)
+        results += bench_cohort(csv_paths, profile["cohort"])
+        if not args.skip_api:
+            largest = max(csv_paths)
+            results += bench_api(csv_paths[largest], user_ids[largest], profile["requests"], args.seed)
+            results += bench_startup(csv_paths[largest], profile["startups"])
+
+    report = {
+        "meta": {
+            "commit": commit,
+            "profile": args.profile,
+            "seed": args.seed,
+            "clock": FIXED_NOW.isoformat(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+    output = args.output or os.path.join(ROOT_DIR, "benchmarks", "results", f"{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results written to {output}")
+
+    if args.compare:
+        return compare(report, args.compare, args.max_regression)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
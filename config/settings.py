@@ -1,16 +1,48 @@
 import os
-from dotenv import load_dotenv
 from typing import Dict, Any
 
-load_dotenv()
+
+def load_env_file() -> None:
+    """Apply the nearest .env at or above this package, like load_dotenv() did.
+
+    python-dotenv is only imported when such a file exists, so deployments
+    configured through the real environment skip it at startup.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        path = os.path.join(directory, ".env")
+        if os.path.isfile(path):
+            from dotenv import load_dotenv
+            load_dotenv(path)
+            return
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return
+        directory = parent
+
+
+load_env_file()
 
 class Settings:
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
     API_TITLE: str = "User Behavior Analysis API"
     API_VERSION: str = "1.0.0"
+    # Worker processes for `python run.py`; more than one shares results through SHARED_CACHE_PATH
+    API_WORKERS: int = int(os.getenv("API_WORKERS", "1"))
+    # Auto-reload for development; only possible with a single worker
+    API_RELOAD: bool = os.getenv("API_RELOAD", "true").lower() in {"1", "true", "yes"}
     
     CSV_FILE_PATH: str = os.getenv("CSV_FILE_PATH", "data/users.csv")
+    # Memory-mapped users directory written by ingest_users.py; empty reads the CSV directly
+    USERS_COLUMNAR_DIR: str = os.getenv("USERS_COLUMNAR_DIR", "")
+    # With API_WORKERS > 1, how often the supervisor checks users.csv for changes to re-snapshot
+    USERS_RELOAD_INTERVAL_SECONDS: float = float(os.getenv("USERS_RELOAD_INTERVAL_SECONDS", "5"))
+    
+    # Catalog for /recommendations: id,title,tags,tools,difficulty_level,category with "|"-separated tags/tools
+    TUTORIALS_CSV_PATH: str = os.getenv("TUTORIALS_CSV_PATH", "data/tutorials.csv")
+    RECOMMENDATIONS_LIMIT: int = int(os.getenv("RECOMMENDATIONS_LIMIT", "10"))
+    RECOMMENDATIONS_MAX_LIMIT: int = int(os.getenv("RECOMMENDATIONS_MAX_LIMIT", "100"))
     
     EVENT_WEIGHTS: Dict[str, float] = {
         "tutorial_viewed": 1.0,
@@ -23,13 +55,47 @@ class Settings:
     TIME_DECAY_FACTOR: float = 0.1
     MIN_INTERACTIONS: int = 2
     MAX_TOP_ITEMS: int = 10
+    # "python" scores event by event, "numpy" uses the columnar engine
+    SCORING_BACKEND: str = os.getenv("SCORING_BACKEND", "python").lower()
     
     CORS_ORIGINS: list = ["*"]
+
+    # /users pagination
+    USERS_PAGE_SIZE: int = int(os.getenv("USERS_PAGE_SIZE", "100"))
+    USERS_MAX_PAGE_SIZE: int = int(os.getenv("USERS_MAX_PAGE_SIZE", "1000"))
+
+    # Keep per-user scores at a reference day and decay them forward instead of
+    # rescoring the full history (applies when Mixpanel is enabled)
+    USE_INCREMENTAL_SCORES: bool = os.getenv("USE_INCREMENTAL_SCORES", "false").lower() in {"1", "true", "yes"}
+    DECAYED_SCORES_PATH: str = os.getenv("DECAYED_SCORES_PATH", "data/decayed_scores.sqlite3")
+
+    # Precomputed profiles written by materialize_profiles.py and served by lookup
+    USE_PROFILE_STORE: bool = os.getenv("USE_PROFILE_STORE", "false").lower() in {"1", "true", "yes"}
+    PROFILE_STORE_PATH: str = os.getenv("PROFILE_STORE_PATH", "data/profiles.sqlite3")
+
+    # Sparse user x tag/tool score matrix saved by materialize_profiles.py and loaded at startup
+    INTEREST_MATRIX_PATH: str = os.getenv("INTEREST_MATRIX_PATH", "data/interest_matrix.npz")
+
+    # POST /interests/batch limits; 0 workers scores in threads instead of processes
+    BATCH_MAX_USERS: int = int(os.getenv("BATCH_MAX_USERS", "1000"))
+    BATCH_SCORING_WORKERS: int = int(os.getenv("BATCH_SCORING_WORKERS", str(os.cpu_count() or 1)))
+
+    # /analytics/cohort: users per map shard (shards run in the scoring pool) and trend window
+    COHORT_SHARD_SIZE: int = int(os.getenv("COHORT_SHARD_SIZE", "2000"))
+    COHORT_TREND_DAYS: int = int(os.getenv("COHORT_TREND_DAYS", "7"))
+
+    # Computed profiles/responses cache; a TTL of 0 disables it
+    RESULT_CACHE_TTL_SECONDS: float = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "300"))
+    RESULT_CACHE_MAX_ENTRIES: int = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "10000"))
+    # SQLite file holding the result cache so every worker process sees the same entries
+    SHARED_CACHE_PATH: str = os.getenv("SHARED_CACHE_PATH", "data/result_cache.sqlite3" if API_WORKERS > 1 else "")
     
     # Mixpanel integration
     USE_MIXPANEL: bool = os.getenv("USE_MIXPANEL", "false").lower() in {"1", "true", "yes"}
     MIXPANEL_API_SECRET: str = os.getenv("MIXPANEL_API_SECRET", "")
     MIXPANEL_PROJECT_ID: str = os.getenv("MIXPANEL_PROJECT_ID", "")
+    # Point at a local stand-in (benchmarks/mixpanel_stub.py) for offline load testing
+    MIXPANEL_EXPORT_URL: str = os.getenv("MIXPANEL_EXPORT_URL", "https://data.mixpanel.com/api/2.0/export/")
     MIXPANEL_DEFAULT_EVENTS: list = [
         "Tutorial Viewed",
         "Tutorial Saved",
@@ -38,6 +104,27 @@ class Settings:
         "Tutorial Liked",
     ]
     MIXPANEL_DEFAULT_WINDOW_DAYS: int = int(os.getenv("MIXPANEL_WINDOW_DAYS", "30"))
+    # Async client connection pool, concurrency and retry policy
+    MIXPANEL_MAX_CONNECTIONS: int = int(os.getenv("MIXPANEL_MAX_CONNECTIONS", "20"))
+    MIXPANEL_MAX_CONCURRENCY: int = int(os.getenv("MIXPANEL_MAX_CONCURRENCY", "10"))
+    MIXPANEL_MAX_RETRIES: int = int(os.getenv("MIXPANEL_MAX_RETRIES", "3"))
+    MIXPANEL_RETRY_BACKOFF_SECONDS: float = float(os.getenv("MIXPANEL_RETRY_BACKOFF_SECONDS", "0.5"))
+    MIXPANEL_TIMEOUT_SECONDS: float = float(os.getenv("MIXPANEL_TIMEOUT_SECONDS", "60"))
+    # Blocking exports are split into chunks of this many days, downloaded in parallel with gzip
+    # and checkpointed on disk so retries fetch only failed chunks; 0 requests the whole window at once
+    MIXPANEL_CHUNK_DAYS: int = int(os.getenv("MIXPANEL_CHUNK_DAYS", "1"))
+    MIXPANEL_DOWNLOAD_WORKERS: int = int(os.getenv("MIXPANEL_DOWNLOAD_WORKERS", "4"))
+    MIXPANEL_CHECKPOINT_DIR: str = os.getenv("MIXPANEL_CHECKPOINT_DIR", "data/export_checkpoints")
+    # Checkpoints of failed or abandoned exports older than this are swept; 0 keeps them
+    MIXPANEL_CHECKPOINT_TTL_HOURS: float = float(os.getenv("MIXPANEL_CHECKPOINT_TTL_HOURS", "24"))
+    # Parse the export as a stream and score it incrementally
+    MIXPANEL_STREAMING: bool = os.getenv("MIXPANEL_STREAMING", "false").lower() in {"1", "true", "yes"}
+
+    # Local event store: completed days are kept on disk and only missing days are fetched
+    USE_EVENT_STORE: bool = os.getenv("USE_EVENT_STORE", "false").lower() in {"1", "true", "yes"}
+    EVENT_STORE_DIR: str = os.getenv("EVENT_STORE_DIR", "data/event_store")
+    # Score from the store's per-day rollups instead of its raw events (requires the event store)
+    USE_DAILY_ROLLUPS: bool = os.getenv("USE_DAILY_ROLLUPS", "false").lower() in {"1", "true", "yes"}
 
     @classmethod
     def get_database_url(cls) -> str:
@@ -1,7 +1,3 @@
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-
 from src.analysis_engine import UserBehaviorAnalysisEngine
 from config.settings import settings
 
@@ -70,7 +66,7 @@ def demo_analysis():
     print("\n" + "=" * 60)
     print("✅ Demo completed!")
     print("\n💡 To start API server run:")
-    print("   python -m src.main")
+    print("   python run.py")
     print("\n🌐 After starting server API will be available at:")
     print("   http://localhost:8000")
     print("\n📚 API Documentation:")
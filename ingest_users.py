@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+
+import argparse
+import sys
+import time
+
+from src.columnar_users import build_columnar_users
+from config.settings import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert users.csv into the memory-mapped columnar directory")
+    parser.add_argument("--csv", default=settings.CSV_FILE_PATH, help="Source users CSV")
+    parser.add_argument("--output", default=settings.USERS_COLUMNAR_DIR or "data/users_columnar", help="Output directory")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    rows = build_columnar_users(args.csv, args.output)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Wrote {rows} users from {args.csv} to {args.output} in {elapsed:.1f}s")
+    print(f"   Serve it with USERS_COLUMNAR_DIR={args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
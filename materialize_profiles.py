@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from src.analysis_engine import UserBehaviorAnalysisEngine, materialize_user_interests
+from src.interest_matrix import InterestMatrix
+from src.profile_store import get_profile_store
+from config.settings import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute interests for every user into the profile store")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Scoring processes")
+    parser.add_argument("--batch-size", type=int, default=500, help="Profiles written per transaction")
+    args = parser.parse_args()
+
+    engine = UserBehaviorAnalysisEngine()
+    user_ids = [user["user_id"] for user in engine.get_all_users_summary(settings.CSV_FILE_PATH)]
+    store = get_profile_store(settings.PROFILE_STORE_PATH)
+    interest_matrix = InterestMatrix()
+
+    started = time.perf_counter()
+    written = 0
+    batch = []
+    with Pool(processes=args.workers) as pool:
+        chunksize = max(1, len(user_ids) // (args.workers * 16))
+        for interests, user_profile in pool.imap_unordered(materialize_user_interests, user_ids, chunksize=chunksize):
+            batch.append(interests)
+            interest_matrix.set_profile(user_profile)
+            if len(batch) >= args.batch_size:
+                written += store.put_many(batch)
+                batch = []
+    written += store.put_many(batch)
+    interest_matrix.save(settings.INTEREST_MATRIX_PATH)
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Materialized {written} profiles into {settings.PROFILE_STORE_PATH} in {elapsed:.1f}s")
+    print(f"✅ Saved scores for {len(interest_matrix)} users to {settings.INTEREST_MATRIX_PATH}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
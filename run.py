@@ -1,18 +1,6 @@
 #!/usr/bin/env python3
 
-import sys
-import os
-
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-
-from config.settings import settings
-import uvicorn
+from src.main import serve
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "src.main:app",
-        host=settings.API_HOST,
-        port=settings.API_PORT,
-        reload=True,
-        log_level="info"
-    )
+    serve()
@@ -1,49 +1,170 @@
-import pandas as pd
-from typing import Dict, List, Tuple
-from datetime import datetime, timedelta
-from collections import defaultdict, Counter
+import asyncio
+import functools
+import json
+import numpy as np
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
 import math
-import os
-import sys
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from src.models import UserEvent, EventType, UserInterest, UserProfile, InterestResponse
-from src.mixpanel_client import fetch_user_events
+from src.models import (
+    UserEvent, EventType, InterestKind, UserProfile, InterestResponse,
+    RecommendationResponse, TutorialRecommendation, CohortAnalytics,
+)
+from src.mixpanel_client import fetch_user_event_batch, fetch_user_events, iter_user_events
+from src.event_batch import DAY_US, EVENT_TYPE_CODES, EventBatch, EventRecord, to_epoch_us
+from src.interest_aggregator import InterestAggregator
+from src.async_mixpanel_client import AsyncMixpanelClient
+from src.export_download import create_export_downloader
+from src.event_store import contiguous_ranges, get_event_store
+from src.bulk_ingest import default_window, ingest_into_cohort
+from src.result_cache import ResultCache
+from src.shared_cache import SharedResultCache
+from src.shared_interest_index import SharedInterestIndex
+from src.single_flight import SingleFlight
+from src.metrics import EVENTS_SCORED, MOCK_FALLBACKS, stage, timed
+from src.profile_store import get_profile_store
+from src.daily_rollups import RollupRow, RollupScores
+from src.decayed_scores import DecayedScores, DecayedScoreStore
+from src.interest_matrix import InterestMatrix, load_interest_matrix
+from src.vectorized_engine import VectorizedInterestScorer
+from src.user_directory import UserDirectory, get_user_directory
+from src.columnar_users import ColumnarUserDirectory, get_columnar_user_directory
+from src.cohort_analytics import CohortAggregate, last_activity_within, last_rollup_within
 from config.settings import settings
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+MOCK_TAGS = [
+    "python", "javascript", "react", "vue", "nodejs", "sql", "mongodb",
+    "docker", "kubernetes", "aws", "git", "api", "frontend", "backend",
+    "mobile", "ios", "android", "design", "ui", "ux", "analytics",
+    "machine-learning", "data-science", "blockchain", "security"
+]
+
+MOCK_TOOLS = [
+    "vscode", "pycharm", "figma", "photoshop", "illustrator", "sketch",
+    "postman", "insomnia", "docker", "kubernetes", "aws-cli", "git",
+    "npm", "yarn", "pip", "conda", "jupyter", "notebook", "slack",
+    "trello", "asana", "notion", "confluence", "github", "gitlab"
+]
+
+MOCK_EVENT_TYPES = [EventType.VIEWED, EventType.SAVED, EventType.COMPLETED, EventType.STARTED]
+
+# Streamed events scored between two yields to the event loop
+STREAM_SLICE_EVENTS = 500
+
+
+@functools.lru_cache(maxsize=256)
+def _mock_item_columns(names: Tuple[str, ...], per_event: int, total_events: int) -> Tuple[Tuple[str, ...], np.ndarray, np.ndarray]:
+    """CSR offsets/codes for the sliding-window item selection of generate_mock_events.
+
+    Depends only on its arguments, so results are cached and shared between
+    batches; the arrays are read-only.
+    """
+    period = len(names)
+    window_codes = [np.arange(start, min(start + per_event, period)) for start in range(period)]
+    period_lengths = np.array([len(codes) for codes in window_codes], dtype=np.int64)
+    period_codes = np.concatenate(window_codes).astype(np.int32)
+
+    full_periods, remainder = divmod(total_events, period)
+    lengths = np.concatenate([np.tile(period_lengths, full_periods), period_lengths[:remainder]])
+    codes = np.concatenate([np.tile(period_codes, full_periods), period_codes[:int(period_lengths[:remainder].sum())]])
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    # Windows slide forward one item per event, so codes are already in first-appearance order
+    seen = int(codes.max()) + 1 if len(codes) else 0
+    offsets.setflags(write=False)
+    codes.setflags(write=False)
+    return names[:seen], offsets, codes
+
+
 class UserBehaviorAnalysisEngine:
-    def __init__(self):
+    def __init__(self, clock: Callable[[], datetime] = datetime.now):
+        # Source of "now" for decay and mock timestamps; benchmarks pin it for reproducible runs
+        self.clock = clock
         self.event_weights = settings.EVENT_WEIGHTS
         self.time_decay_factor = settings.TIME_DECAY_FACTOR
         self.min_interactions = settings.MIN_INTERACTIONS
         self.max_top_items = settings.MAX_TOP_ITEMS
+        self.scoring_backend = settings.SCORING_BACKEND
+        self.vectorized_scorer = VectorizedInterestScorer(
+            event_weights=self.event_weights,
+            time_decay_factor=self.time_decay_factor,
+            min_interactions=self.min_interactions,
+            max_top_items=self.max_top_items,
+        )
+        self.result_cache = self._create_result_cache()
+        # Concurrent requests for one user share a single export and scoring run
+        self.profile_flights = SingleFlight()
+        self._data_versions: Dict[str, int] = {}
+        self.async_mixpanel = AsyncMixpanelClient(
+            api_secret=settings.MIXPANEL_API_SECRET,
+            export_url=settings.MIXPANEL_EXPORT_URL,
+            max_connections=settings.MIXPANEL_MAX_CONNECTIONS,
+            max_concurrency=settings.MIXPANEL_MAX_CONCURRENCY,
+            max_retries=settings.MIXPANEL_MAX_RETRIES,
+            backoff_seconds=settings.MIXPANEL_RETRY_BACKOFF_SECONDS,
+            timeout_seconds=settings.MIXPANEL_TIMEOUT_SECONDS,
+        )
+        # Chunked, checkpointed downloads for the blocking export paths; None when MIXPANEL_CHUNK_DAYS is 0
+        self.export_downloader = create_export_downloader()
+        self._scoring_pool: Optional[ProcessPoolExecutor] = None
+        self.decayed_score_store = (
+            DecayedScoreStore(settings.DECAYED_SCORES_PATH) if settings.USE_INCREMENTAL_SCORES else None
+        )
+        self.profile_store = get_profile_store(settings.PROFILE_STORE_PATH) if settings.USE_PROFILE_STORE else None
+        self.event_store = get_event_store(settings.EVENT_STORE_DIR) if settings.USE_EVENT_STORE else None
+        self.interest_matrix = self._create_interest_matrix()
+
+    def _create_result_cache(self) -> Union[ResultCache, SharedResultCache]:
+        if settings.SHARED_CACHE_PATH:
+            return SharedResultCache(
+                path=settings.SHARED_CACHE_PATH,
+                ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+                max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+                models={"profile": UserProfile, "interests": InterestResponse},
+            )
+        return ResultCache(
+            ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+            max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+        )
+
+    def _create_interest_matrix(self) -> Union[InterestMatrix, SharedInterestIndex]:
+        # Workers sharing a result cache also share the top-users index, in the same file
+        if settings.SHARED_CACHE_PATH:
+            index = SharedInterestIndex(settings.SHARED_CACHE_PATH)
+            index.import_matrix(settings.INTEREST_MATRIX_PATH)
+            return index
+        return load_interest_matrix(settings.INTEREST_MATRIX_PATH)
+
+    def load_user_data(self, csv_file_path: str) -> "pd.DataFrame":
+        import pandas as pd
 
-    def load_user_data(self, csv_file_path: str) -> pd.DataFrame:
         try:
-            df = pd.read_csv(csv_file_path)
+            with stage("load_user_data"):
+                df = pd.read_csv(csv_file_path)
             return df
         except Exception as e:
             raise Exception(f"Error loading data: {e}")
 
+    def get_user_directory(self, csv_file_path: str) -> Union[UserDirectory, ColumnarUserDirectory]:
+        if settings.USERS_COLUMNAR_DIR:
+            return get_columnar_user_directory(settings.USERS_COLUMNAR_DIR)
+        return get_user_directory(csv_file_path)
+
+    def get_user(self, user_id: str, csv_file_path: str) -> Dict:
+        user = self.get_user_directory(csv_file_path).get(user_id)
+        if user is None:
+            raise ValueError(f"User with ID {user_id} not found")
+        return user
+
     def generate_mock_events(self, user_id: str, total_events: int) -> List[UserEvent]:
         events = []
         
-        available_tags = [
-            "python", "javascript", "react", "vue", "nodejs", "sql", "mongodb",
-            "docker", "kubernetes", "aws", "git", "api", "frontend", "backend",
-            "mobile", "ios", "android", "design", "ui", "ux", "analytics",
-            "machine-learning", "data-science", "blockchain", "security"
-        ]
-        
-        available_tools = [
-            "vscode", "pycharm", "figma", "photoshop", "illustrator", "sketch",
-            "postman", "insomnia", "docker", "kubernetes", "aws-cli", "git",
-            "npm", "yarn", "pip", "conda", "jupyter", "notebook", "slack",
-            "trello", "asana", "notion", "confluence", "github", "gitlab"
-        ]
-        
-        event_types = [EventType.VIEWED, EventType.SAVED, EventType.COMPLETED, EventType.STARTED]
+        available_tags = MOCK_TAGS
+        available_tools = MOCK_TOOLS
+        event_types = MOCK_EVENT_TYPES
         
         for i in range(total_events):
             event_type = event_types[i % len(event_types)]
@@ -55,7 +176,7 @@ class UserBehaviorAnalysisEngine:
             selected_tools = available_tools[i % len(available_tools):i % len(available_tools) + num_tools]
             
             days_ago = int((total_events - i) % 30)
-            timestamp = datetime.now() - timedelta(days=days_ago)
+            timestamp = self.clock() - timedelta(days=days_ago)
             
             event = UserEvent(
                 user_id=user_id,
@@ -69,136 +190,686 @@ class UserBehaviorAnalysisEngine:
         
         return events
 
-    def get_events_for_user(self, user_id: str) -> List[UserEvent]:
+    def generate_mock_event_batch(self, user_id: str, total_events: int) -> EventBatch:
+        """Columnar equivalent of generate_mock_events, built without per-event objects."""
+        positions = np.arange(total_events, dtype=np.int64)
+        now_us = to_epoch_us(self.clock())
+
+        tag_names, tag_offsets, tag_codes = _mock_item_columns(tuple(MOCK_TAGS), 3, total_events)
+        tool_names, tool_offsets, tool_codes = _mock_item_columns(tuple(MOCK_TOOLS), 2, total_events)
+        mock_type_codes = np.array([EVENT_TYPE_CODES[event_type] for event_type in MOCK_EVENT_TYPES], dtype=np.int8)
+
+        return EventBatch(
+            user_id=user_id,
+            tutorial_names=[f"tutorial_{i}" for i in range(min(total_events, 50))],
+            tag_names=list(tag_names),
+            tool_names=list(tool_names),
+            tutorial_codes=(positions % 50).astype(np.int32),
+            event_types=mock_type_codes[positions % len(MOCK_EVENT_TYPES)],
+            timestamps=now_us - ((total_events - positions) % 30) * DAY_US,
+            tag_offsets=tag_offsets,
+            tag_codes=tag_codes,
+            tool_offsets=tool_offsets,
+            tool_codes=tool_codes,
+        )
+
+    def _mixpanel_window(self) -> Tuple[date, date]:
+        return default_window()
+
+    def _mixpanel_enabled(self) -> bool:
+        return bool(settings.USE_MIXPANEL and settings.MIXPANEL_API_SECRET)
+
+    def _fetch_from_mixpanel(self, user_id: str, from_date: str, to_date: str) -> List[EventRecord]:
+        return fetch_user_events(
+            user_id=user_id,
+            from_date=from_date,
+            to_date=to_date,
+            event_names=settings.MIXPANEL_DEFAULT_EVENTS,
+            api_secret=settings.MIXPANEL_API_SECRET,
+            export_url=settings.MIXPANEL_EXPORT_URL,
+            downloader=self.export_downloader,
+        )
+
+    def sync_user_events(self, user_id: str) -> int:
+        """Pull the days of the current window missing from the event store."""
+        from_date, to_date = self._mixpanel_window()
+        return self.event_store.sync_user(
+            user_id,
+            from_date,
+            to_date,
+            lambda from_day, to_day: self._fetch_from_mixpanel(user_id, from_day, to_day),
+        )
+
+    def _synced_store_window(self, user_id: str) -> Optional[Tuple[date, date]]:
+        """Sync the store and return the window to read, or None if it has nothing to serve."""
+        from_date, to_date = self._mixpanel_window()
+        try:
+            self.sync_user_events(user_id)
+            return from_date, to_date
+        except Exception:
+            # Serve whatever the store already holds if Mixpanel is unavailable
+            if self.event_store.has_user_data(user_id, from_date, to_date):
+                return from_date, to_date
+        return None
+
+    @timed("get_events_for_user")
+    def get_event_batch_for_user(self, user_id: str) -> EventBatch:
         """Return events from Mixpanel if enabled, otherwise generate mocks.
 
-        Date window and event names are driven by settings.
+        Date window and event names are driven by settings. With the event
+        store enabled only days missing locally are fetched from Mixpanel.
         """
-        if settings.USE_MIXPANEL and settings.MIXPANEL_API_SECRET:
-            to_date = datetime.utcnow().date()
-            from_date = (to_date - timedelta(days=settings.MIXPANEL_DEFAULT_WINDOW_DAYS))
-            try:
-                return fetch_user_events(
-                    user_id=user_id,
-                    from_date=str(from_date),
-                    to_date=str(to_date),
-                    event_names=settings.MIXPANEL_DEFAULT_EVENTS,
-                    api_secret=settings.MIXPANEL_API_SECRET,
-                )
-            except Exception as e:
-                # Fallback to mocks if Mixpanel fails
-                pass
+        if self._mixpanel_enabled():
+            if self.event_store is not None:
+                window = self._synced_store_window(user_id)
+                if window is not None:
+                    return self.event_store.get_event_batch(user_id, *window)
+            else:
+                from_date, to_date = self._mixpanel_window()
+                try:
+                    return fetch_user_event_batch(
+                        user_id=user_id,
+                        from_date=str(from_date),
+                        to_date=str(to_date),
+                        event_names=settings.MIXPANEL_DEFAULT_EVENTS,
+                        api_secret=settings.MIXPANEL_API_SECRET,
+                        export_url=settings.MIXPANEL_EXPORT_URL,
+                        downloader=self.export_downloader,
+                    )
+                except Exception as e:
+                    # Fallback to mocks if Mixpanel fails
+                    pass
+            MOCK_FALLBACKS.inc()
 
         # Fallback requires an estimate of total events. Use minimal number to avoid empty analysis.
-        return self.generate_mock_events(user_id, total_events=20)
+        return self.generate_mock_event_batch(user_id, total_events=20)
+
+    def get_events_for_user(self, user_id: str) -> List[UserEvent]:
+        return self.get_event_batch_for_user(user_id).to_events()
+
+    def _iter_mixpanel_events(self, user_id: str, from_date: date, to_date: date) -> Iterator[EventRecord]:
+        """Stream the user's export for a date range; raises if Mixpanel fails."""
+        return iter_user_events(
+            user_id=user_id,
+            from_date=str(from_date),
+            to_date=str(to_date),
+            event_names=settings.MIXPANEL_DEFAULT_EVENTS,
+            api_secret=settings.MIXPANEL_API_SECRET,
+            export_url=settings.MIXPANEL_EXPORT_URL,
+            downloader=self.export_downloader,
+        )
+
+    def iter_events_for_user(self, user_id: str) -> Iterator[EventRecord]:
+        """Streaming counterpart of get_events_for_user.
+
+        Falls back to mocks only if Mixpanel fails before the first event;
+        a failure mid-stream is raised so a partial history is never scored.
+        """
+        if self._mixpanel_enabled():
+            if self.event_store is not None:
+                window = self._synced_store_window(user_id)
+                if window is not None:
+                    yield from self.event_store.iter_events(user_id, *window)
+                    return
+            else:
+                started = False
+                try:
+                    for event in self._iter_mixpanel_events(user_id, *self._mixpanel_window()):
+                        started = True
+                        yield event
+                    return
+                except Exception:
+                    if started:
+                        raise
+            MOCK_FALLBACKS.inc()
+
+        yield from self.generate_mock_event_batch(user_id, total_events=20).iter_records()
 
     def calculate_time_decay(self, event_time: datetime) -> float:
-        days_ago = int((datetime.now() - event_time).days)
+        days_ago = int((self.clock() - event_time).days)
         return math.exp(-self.time_decay_factor * days_ago)
 
-    def analyze_user_interests(self, user_id: str, events: List[UserEvent]) -> UserProfile:
-        tag_scores = defaultdict(float)
-        tool_scores = defaultdict(float)
-        tag_interactions = defaultdict(int)
-        tool_interactions = defaultdict(int)
-        last_interactions = {}
-        
-        for event in events:
-            event_weight = self.event_weights.get(event.event_type, 1.0)
-            time_decay = self.calculate_time_decay(event.timestamp)
-            final_weight = event_weight * time_decay
-            
-            for tag in event.tags:
-                tag_scores[tag] += final_weight
-                tag_interactions[tag] += 1
-                last_interactions[f"tag_{tag}"] = event.timestamp
-            
-            for tool in event.tools:
-                tool_scores[tool] += final_weight
-                tool_interactions[tool] += 1
-                last_interactions[f"tool_{tool}"] = event.timestamp
-        
-        interests = []
-        
-        for tag, score in tag_scores.items():
-            if tag_interactions[tag] >= self.min_interactions:
-                interests.append(UserInterest(
-                    tag_or_tool=tag,
-                    score=score,
-                    interaction_count=tag_interactions[tag],
-                    last_interaction=last_interactions.get(f"tag_{tag}", datetime.now())
-                ))
-        
-        for tool, score in tool_scores.items():
-            if tool_interactions[tool] >= self.min_interactions:
-                interests.append(UserInterest(
-                    tag_or_tool=tool,
-                    score=score,
-                    interaction_count=tool_interactions[tool],
-                    last_interaction=last_interactions.get(f"tool_{tool}", datetime.now())
-                ))
-        
-        interests.sort(key=lambda x: x.score, reverse=True)
-        
-        top_tags = [interest.tag_or_tool for interest in interests 
-                   if interest.tag_or_tool in [tag for tag, _ in tag_scores.items()]][:self.max_top_items]
-        
-        top_tools = [interest.tag_or_tool for interest in interests 
-                    if interest.tag_or_tool in [tool for tool, _ in tool_scores.items()]][:self.max_top_items]
-        
-        return UserProfile(
-            user_id=user_id,
-            email="",
-            name="",
-            total_events=len(events),
-            interests=interests,
-            top_tags=top_tags,
-            top_tools=top_tools
+    @timed("analyze_user_interests")
+    def analyze_user_interests(self, user_id: str, events: Union[List[UserEvent], EventBatch]) -> UserProfile:
+        EVENTS_SCORED.observe(len(events))
+        if self.scoring_backend == "numpy":
+            return self.vectorized_scorer.analyze(user_id, events, now=self.clock())
+
+        if isinstance(events, EventBatch):
+            return self.create_aggregator().add_batch(events).build_profile(user_id)
+        return self.create_aggregator().add_events(events).build_profile(user_id)
+
+    def create_aggregator(self) -> InterestAggregator:
+        return InterestAggregator(
+            event_weights=self.event_weights,
+            time_decay_factor=self.time_decay_factor,
+            min_interactions=self.min_interactions,
+            max_top_items=self.max_top_items,
+            now=self.clock(),
         )
 
+    @timed("analyze_user_interests")
+    def analyze_event_stream(self, user_id: str, events: Iterable[EventRecord]) -> UserProfile:
+        """Score events as they are consumed without materializing them."""
+        aggregator = self.create_aggregator().add_events(events)
+        EVENTS_SCORED.observe(aggregator.total_events)
+        return aggregator.build_profile(user_id)
+
+    def create_decayed_scores(self, reference_day: date) -> DecayedScores:
+        return DecayedScores(
+            event_weights=self.event_weights,
+            time_decay_factor=self.time_decay_factor,
+            min_interactions=self.min_interactions,
+            max_top_items=self.max_top_items,
+            reference_day=reference_day,
+            window_days=settings.MIXPANEL_DEFAULT_WINDOW_DAYS,
+        )
+
+    def _load_decayed_scores(self, user_id: str) -> DecayedScores:
+        scores = self.create_decayed_scores(reference_day=self.clock().date())
+        self.decayed_score_store.load(user_id, scores)
+        return scores
+
+    def update_decayed_scores(self, user_id: str) -> DecayedScores:
+        """Load the user's stored scores and re-read only the days from its watermark on.
+
+        The watermark's day is re-read whole, so events that arrive late
+        for that day or later are counted. Events arriving after a later
+        day was read are not; invalidate_user drops the state so the next
+        read rebuilds it from the full window. Only real events are ever
+        folded in: without an event store Mixpanel is read without the mock
+        fallback, and if it fails the stored state is served as it is and
+        nothing is saved.
+        """
+        scores = self._load_decayed_scores(user_id)
+        stored_day = scores.reference_day
+        # Expire days that left the window before new events are folded in
+        scores.advance_to(self.clock().date())
+        resume_day = scores.resume_day()
+        # One day of slack: stored days and export ranges may differ from event dates by a day
+        to_date = self._mixpanel_window()[1]
+        from_date = resume_day - timedelta(days=1)
+
+        if self.event_store is not None:
+            try:
+                self.sync_user_events(user_id)
+            except Exception:
+                # Score whatever the store already holds if Mixpanel is unavailable
+                pass
+            events = self.event_store.iter_events(user_id, from_date, to_date)
+        else:
+            events = self._iter_mixpanel_events(user_id, from_date, to_date)
+
+        try:
+            changed = scores.refold_days(resume_day, events)
+        except Exception:
+            # Events folded in before the failure are dropped with the partial state
+            return self._load_decayed_scores(user_id)
+        if changed or scores.reference_day != stored_day:
+            self.decayed_score_store.save(user_id, scores)
+        return scores
+
+    @timed("analyze_user_interests")
+    def analyze_rollups(self, user_id: str, rows: Iterable[RollupRow], reference_day: date) -> UserProfile:
+        """Score daily rollup rows as of the end of ``reference_day``."""
+        scores = RollupScores(
+            event_weights=self.event_weights,
+            time_decay_factor=self.time_decay_factor,
+            min_interactions=self.min_interactions,
+            max_top_items=self.max_top_items,
+            reference_day=reference_day,
+        ).add_rollups(rows)
+        EVENTS_SCORED.observe(scores.total_events)
+        return scores.build_profile(user_id)
+
+    def _uses_rollups(self) -> bool:
+        return settings.USE_DAILY_ROLLUPS and self.event_store is not None and self._mixpanel_enabled()
+
+    def _uses_stored_scores(self) -> bool:
+        """True if profiles come from incremental scores or rollups instead of a full event read."""
+        return (self.decayed_score_store is not None and self._mixpanel_enabled()) or self._uses_rollups()
+
+    def _compute_user_profile(self, user_id: str) -> UserProfile:
+        if self.decayed_score_store is not None and self._mixpanel_enabled():
+            scores = self.update_decayed_scores(user_id)
+            return scores.build_profile(user_id, as_of=self.clock().date())
+        if self._uses_rollups():
+            window = self._synced_store_window(user_id)
+            if window is not None:
+                rows = self.event_store.iter_rollups(user_id, *window)
+                return self.analyze_rollups(user_id, rows, reference_day=self.clock().date())
+        if settings.MIXPANEL_STREAMING:
+            return self.analyze_event_stream(user_id, self.iter_events_for_user(user_id))
+        events = self.get_event_batch_for_user(user_id)
+        return self.analyze_user_interests(user_id, events)
+
+    def _remember_profile(self, user_id: str, user_profile: UserProfile) -> None:
+        self.result_cache.set(user_id, "profile", user_profile)
+        self.interest_matrix.set_profile(user_profile)
+
+    def _data_version(self, user_id: str) -> int:
+        """Bumped by invalidate_user; computations started before it neither join later callers nor get cached."""
+        return self._data_versions.get(user_id, 0)
+
+    def _remember_if_current(self, user_id: str, version: int, user_profile: UserProfile) -> UserProfile:
+        if self._data_version(user_id) == version:
+            self._remember_profile(user_id, user_profile)
+        return user_profile
+
+    def _remember_interests_if_current(
+        self, user_id: str, version: int, interests: InterestResponse
+    ) -> InterestResponse:
+        if self._data_version(user_id) == version:
+            self.result_cache.set(user_id, "interests", interests)
+        return interests
+
+    def get_user_profile(self, user_id: str) -> UserProfile:
+        user_profile = self.result_cache.get(user_id, "profile")
+        if user_profile is None:
+            version = self._data_version(user_id)
+            user_profile = self.profile_flights.do(
+                (user_id, version),
+                lambda: self._remember_if_current(user_id, version, self._compute_user_profile(user_id)),
+            )
+        return user_profile
+
+    def invalidate_user(self, user_id: str) -> int:
+        """Drop cached and materialized results for a user, e.g. after new events were synced."""
+        self._data_versions[user_id] = self._data_version(user_id) + 1
+        if self.profile_store is not None:
+            self.profile_store.delete(user_id)
+        if self.decayed_score_store is not None:
+            self.decayed_score_store.delete(user_id)
+        self.interest_matrix.remove_user(user_id)
+        return self.result_cache.invalidate_user(user_id)
+
+    def _get_stored_interests(self, user_id: str, version: int) -> Optional[InterestResponse]:
+        interests = self.result_cache.get(user_id, "interests")
+        if interests is None and self.profile_store is not None:
+            interests = self.profile_store.get(user_id)
+            if interests is not None:
+                self._remember_interests_if_current(user_id, version, interests)
+        return interests
+
     def get_user_interests(self, user_id: str, csv_file_path: str) -> InterestResponse:
-        df = self.load_user_data(csv_file_path)
-        
-        user_data = df[df['Distinct ID'] == user_id]
-        if user_data.empty:
-            raise ValueError(f"User with ID {user_id} not found")
-        
-        user_row = user_data.iloc[0]
-        total_events = int(user_row['Total Events of Tutorial viewed or Tutorial is saved or 4 others'])
-        
-        events = self.get_events_for_user(user_id)
-        user_profile = self.analyze_user_interests(user_id, events)
-        
+        self.get_user(user_id, csv_file_path)
+
+        version = self._data_version(user_id)
+        interests = self._get_stored_interests(user_id, version)
+        if interests is None:
+            interests = self._build_interest_response(user_id, self.get_user_profile(user_id))
+            self._remember_interests_if_current(user_id, version, interests)
+        return interests
+
+    @timed("build_response")
+    def _build_interest_response(self, user_id: str, user_profile: UserProfile) -> InterestResponse:
+        scores = {(interest.kind, interest.tag_or_tool): interest.score for interest in user_profile.interests}
+
+        # top_tags/top_tools are already ranked; look each one up in its own namespace
         top_tags = [
-            {interest.tag_or_tool: interest.score} 
-            for interest in user_profile.interests 
-            if interest.tag_or_tool in user_profile.top_tags
-        ][:self.max_top_items]
+            {tag: scores[(InterestKind.TAG, tag)]}
+            for tag in user_profile.top_tags[:self.max_top_items]
+        ]
         
         top_tools = [
-            {interest.tag_or_tool: interest.score} 
-            for interest in user_profile.interests 
-            if interest.tag_or_tool in user_profile.top_tools
-        ][:self.max_top_items]
+            {tool: scores[(InterestKind.TOOL, tool)]}
+            for tool in user_profile.top_tools[:self.max_top_items]
+        ]
         
         return InterestResponse(
             user_id=user_id,
             top_tags=top_tags,
             top_tools=top_tools,
             total_interactions=user_profile.total_events,
-            analysis_timestamp=datetime.now()
+            analysis_timestamp=self.clock()
         )
 
     def get_all_users_summary(self, csv_file_path: str) -> List[Dict]:
-        df = self.load_user_data(csv_file_path)
-        
-        summary = []
-        for _, row in df.iterrows():
-            summary.append({
-                "user_id": row['Distinct ID'],
-                "email": row['Email'],
-                "name": row['Name'],
-                "total_events": int(row['Total Events of Tutorial viewed or Tutorial is saved or 4 others'])
-            })
-        
-        return summary
+        return self.get_user_directory(csv_file_path).all_users()
+
+    def get_users_page(self, csv_file_path: str, offset: int, limit: int) -> Dict:
+        directory = self.get_user_directory(csv_file_path)
+        users = directory.page(offset, limit)
+        total_users = len(directory)
+        next_offset = offset + len(users)
+        return {
+            "users": users,
+            "total_users": total_users,
+            "offset": offset,
+            "limit": limit,
+            "next_offset": next_offset if next_offset < total_users else None
+        }
+
+    def get_analytics_summary(self, csv_file_path: str, top_n: int = 5) -> Dict:
+        return dict(self.get_user_directory(csv_file_path).summary(top_n))
+
+    def get_top_users_for_item(self, kind: InterestKind, name: str, limit: int) -> List[Dict]:
+        """Highest-scoring users for a tag or tool among users scored or materialized so far."""
+        return [
+            {"user_id": user_id, "score": score}
+            for user_id, score in self.interest_matrix.top_users(kind, name, limit)
+        ]
+
+    async def async_sync_user_events(self, user_id: str) -> int:
+        from_date, to_date = self._mixpanel_window()
+        missing = await asyncio.to_thread(self.event_store.missing_days, user_id, from_date, to_date)
+        written = 0
+        for range_start, range_end in contiguous_ranges(missing):
+            events = await self.async_mixpanel.fetch_user_events(
+                user_id=user_id,
+                from_date=range_start.isoformat(),
+                to_date=range_end.isoformat(),
+                event_names=settings.MIXPANEL_DEFAULT_EVENTS,
+            )
+            written += await asyncio.to_thread(self.event_store.replace_events, user_id, range_start, range_end, events)
+        return written
+
+    @timed("get_events_for_user")
+    async def aget_event_batch_for_user(self, user_id: str) -> EventBatch:
+        """Non-blocking get_event_batch_for_user; Mixpanel is reached through the pooled async client."""
+        if self._mixpanel_enabled():
+            from_date, to_date = self._mixpanel_window()
+            if self.event_store is not None:
+                try:
+                    await self.async_sync_user_events(user_id)
+                    synced = True
+                except Exception:
+                    synced = await asyncio.to_thread(self.event_store.has_user_data, user_id, from_date, to_date)
+                if synced:
+                    return await asyncio.to_thread(self.event_store.get_event_batch, user_id, from_date, to_date)
+            else:
+                try:
+                    return await self.async_mixpanel.fetch_user_event_batch(
+                        user_id=user_id,
+                        from_date=str(from_date),
+                        to_date=str(to_date),
+                        event_names=settings.MIXPANEL_DEFAULT_EVENTS,
+                    )
+                except Exception:
+                    # Fallback to mocks if Mixpanel fails
+                    pass
+            MOCK_FALLBACKS.inc()
+
+        return self.generate_mock_event_batch(user_id, total_events=20)
+
+    async def aget_events_for_user(self, user_id: str) -> List[UserEvent]:
+        return (await self.aget_event_batch_for_user(user_id)).to_events()
+
+    async def _astream_user_profile(self, user_id: str) -> Optional[UserProfile]:
+        """Aggregate the export while it streams; None if Mixpanel failed before the first event.
+
+        Buffered lines are consumed without reaching an await, so scoring
+        yields to the event loop after every STREAM_SLICE_EVENTS events and
+        a heavy user never holds the loop for a whole scoring pass.
+        """
+        from_date, to_date = self._mixpanel_window()
+        aggregator = self.create_aggregator()
+        try:
+            async for event in self.async_mixpanel.iter_user_events(
+                user_id=user_id,
+                from_date=str(from_date),
+                to_date=str(to_date),
+                event_names=settings.MIXPANEL_DEFAULT_EVENTS,
+            ):
+                aggregator.add(event)
+                if aggregator.total_events % STREAM_SLICE_EVENTS == 0:
+                    await asyncio.sleep(0)
+        except Exception:
+            if aggregator.total_events:
+                raise
+            return None
+        EVENTS_SCORED.observe(aggregator.total_events)
+        return aggregator.build_profile(user_id)
+
+    async def aget_user_profile(self, user_id: str) -> UserProfile:
+        user_profile = self.result_cache.get(user_id, "profile")
+        if user_profile is not None:
+            return user_profile
+
+        version = self._data_version(user_id)
+        return await self.profile_flights.ado((user_id, version), lambda: self._acompute_user_profile(user_id, version))
+
+    async def _acompute_user_profile(self, user_id: str, version: int) -> UserProfile:
+        user_profile = None
+        if self._uses_stored_scores():
+            # Incremental updates and rollups touch only a few rows; run them off the event loop
+            user_profile = await asyncio.to_thread(self._compute_user_profile, user_id)
+        elif settings.MIXPANEL_STREAMING and self._mixpanel_enabled() and self.event_store is None:
+            user_profile = await self._astream_user_profile(user_id)
+        if user_profile is None:
+            events = await self.aget_event_batch_for_user(user_id)
+            # Scoring is CPU-bound; keep it off the event loop
+            user_profile = await asyncio.to_thread(self.analyze_user_interests, user_id, events)
+        return self._remember_if_current(user_id, version, user_profile)
+
+    async def aget_user_interests(self, user_id: str, csv_file_path: str) -> InterestResponse:
+        # Reloading a changed users.csv parses the whole file; keep it off the event loop
+        await asyncio.to_thread(self.get_user, user_id, csv_file_path)
+
+        version = self._data_version(user_id)
+        interests = self._get_stored_interests(user_id, version)
+        if interests is None:
+            interests = self._build_interest_response(user_id, await self.aget_user_profile(user_id))
+            self._remember_interests_if_current(user_id, version, interests)
+        return interests
+
+    async def aget_recommendations(
+        self, user_id: str, csv_file_path: str, tutorials_file_path: str, limit: int
+    ) -> RecommendationResponse:
+        """Top tutorials for the user's interest profile, skipping tutorials they already completed."""
+        # The catalog pulls in pandas and scipy; only this endpoint needs it
+        from src.tutorial_catalog import get_tutorial_catalog
+
+        await asyncio.to_thread(self.get_user, user_id, csv_file_path)
+        catalog = get_tutorial_catalog(tutorials_file_path)
+        # Parsing a changed catalog is the only slow step; keep it off the event loop
+        await asyncio.to_thread(catalog.refresh)
+
+        # Completed tutorials are collected by the same scoring run and cached with the profile
+        user_profile = await self.aget_user_profile(user_id)
+        completed = user_profile.completed_tutorials
+        with stage("recommend"):
+            recommendations = catalog.recommend(user_profile, limit, exclude_ids=completed)
+
+        return RecommendationResponse(
+            user_id=user_id,
+            recommendations=[
+                TutorialRecommendation(tutorial=tutorial, score=score) for tutorial, score in recommendations
+            ],
+            excluded_completed=len(completed),
+            analysis_timestamp=self.clock(),
+        )
+
+    def aggregate_cohort(
+        self, user_ids: List[str], now: datetime, trend_days: int, active_within_days: Optional[int] = None
+    ) -> CohortAggregate:
+        """Map step of a cohort query: fold the events of each user in the segment into one partial.
+
+        With the event store the map reads each user's rollups as stored,
+        which still cover compacted days, and never syncs. Without it the
+        users are read from one bulk export, and a failed export is raised
+        rather than replaced by mocks; mocks are only used when Mixpanel is
+        not configured.
+        """
+        if self._mixpanel_enabled():
+            from_date, to_date = self._mixpanel_window()
+            if self.event_store is None:
+                return ingest_into_cohort(self, from_date, to_date, user_ids, now, trend_days, active_within_days)
+            aggregate = CohortAggregate()
+            for user_id in user_ids:
+                rows = list(self.event_store.iter_rollups(user_id, from_date, to_date))
+                if last_rollup_within(rows, now, active_within_days):
+                    aggregate.add_rollups(rows, self.vectorized_scorer, now, trend_days)
+            return aggregate
+
+        aggregate = CohortAggregate()
+        for user_id in user_ids:
+            batch = self.generate_mock_event_batch(user_id, total_events=20)
+            if last_activity_within(batch, now, active_within_days):
+                aggregate.add_batch(batch, self.vectorized_scorer, now, trend_days)
+        return aggregate
+
+    async def aget_cohort_analytics(
+        self,
+        csv_file_path: str,
+        active_within_days: Optional[int] = None,
+        min_total_events: Optional[int] = None,
+        max_total_events: Optional[int] = None,
+        trend_days: int = 7,
+        top_n: int = 10,
+    ) -> CohortAnalytics:
+        """Top tags and tools of a user segment, computed as a map-reduce over shards of users.
+
+        The event-total bounds are applied to the users directory up front;
+        the activity window needs each user's events and is applied in the
+        map step. Shards run in the scoring pool and their partial
+        aggregates are merged as they complete.
+        """
+        directory = self.get_user_directory(csv_file_path)
+        user_ids = await asyncio.to_thread(directory.user_ids, min_total_events, max_total_events)
+        total_users = await asyncio.to_thread(len, directory)
+        now = self.clock()
+
+        loop = asyncio.get_running_loop()
+        if self._mixpanel_enabled() and self.event_store is None:
+            # Every shard would download the whole export; read it once for the full segment
+            pool = None
+            shard_size = max(1, len(user_ids))
+        else:
+            pool = self._get_scoring_pool()
+            shard_size = max(1, settings.COHORT_SHARD_SIZE)
+        # Thread-pool shards can use this engine directly; processes use their worker engine
+        map_shard = aggregate_cohort_shard if pool is not None else self.aggregate_cohort
+        with stage("cohort_map_reduce"):
+            shards = [
+                loop.run_in_executor(
+                    pool, map_shard, user_ids[start:start + shard_size], now, trend_days, active_within_days
+                )
+                for start in range(0, len(user_ids), shard_size)
+            ]
+            aggregate = CohortAggregate()
+            try:
+                for shard in asyncio.as_completed(shards):
+                    aggregate.merge(await shard)
+            finally:
+                for shard in shards:
+                    shard.cancel()
+
+        return CohortAnalytics(
+            total_users=total_users,
+            matched_users=aggregate.users,
+            total_events=aggregate.total_events,
+            segment={
+                "active_within_days": active_within_days,
+                "min_total_events": min_total_events,
+                "max_total_events": max_total_events,
+            },
+            trend_days=trend_days,
+            top_tags=aggregate.top_items(InterestKind.TAG, top_n),
+            top_tools=aggregate.top_items(InterestKind.TOOL, top_n),
+            analysis_timestamp=now,
+        )
+
+    def _get_scoring_pool(self) -> Optional[ProcessPoolExecutor]:
+        if settings.BATCH_SCORING_WORKERS > 0 and self._scoring_pool is None:
+            self._scoring_pool = ProcessPoolExecutor(
+                max_workers=settings.BATCH_SCORING_WORKERS,
+                initializer=_init_worker_engine,
+                initargs=(self.clock,),
+            )
+        return self._scoring_pool
+
+    async def _ascore_in_pool(self, user_id: str, version: int) -> UserProfile:
+        if self._uses_stored_scores():
+            # Same scores as /interests/{user_id}, which shares the "profile" cache entry
+            user_profile = await asyncio.to_thread(self._compute_user_profile, user_id)
+            return self._remember_if_current(user_id, version, user_profile)
+        events = await self.aget_event_batch_for_user(user_id)
+        loop = asyncio.get_running_loop()
+        # With BATCH_SCORING_WORKERS=0 this runs on the default thread pool
+        user_profile = await loop.run_in_executor(self._get_scoring_pool(), score_user_events, user_id, events)
+        return self._remember_if_current(user_id, version, user_profile)
+
+    async def _ascore_for_batch(self, user_id: str) -> str:
+        try:
+            version = self._data_version(user_id)
+            user_profile = self.result_cache.get(user_id, "profile")
+            if user_profile is None:
+                user_profile = await self.profile_flights.ado(
+                    (user_id, version), lambda: self._ascore_in_pool(user_id, version)
+                )
+
+            interests = self._build_interest_response(user_id, user_profile)
+            self._remember_interests_if_current(user_id, version, interests)
+            return interests.model_dump_json()
+        except Exception as e:
+            return json.dumps({"user_id": user_id, "error": f"User analysis error: {e}"})
+
+    async def aiter_batch_interests(self, user_ids: List[str], csv_file_path: str) -> AsyncIterator[str]:
+        """Yield one JSON document per user as soon as its result is ready.
+
+        Users are resolved against one directory snapshot, cached results are
+        emitted first and the rest are fetched concurrently and scored in the
+        process pool, in completion order.
+        """
+        directory = self.get_user_directory(csv_file_path)
+        users = await asyncio.to_thread(directory.get_many, list(dict.fromkeys(user_ids)))
+
+        pending = []
+        for user_id, user in users.items():
+            if user is None:
+                yield json.dumps({"user_id": user_id, "error": f"User with ID {user_id} not found"})
+                continue
+            interests = self._get_stored_interests(user_id, self._data_version(user_id))
+            if interests is not None:
+                yield interests.model_dump_json()
+                continue
+            pending.append(asyncio.ensure_future(self._ascore_for_batch(user_id)))
+
+        try:
+            for future in asyncio.as_completed(pending):
+                yield await future
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def aclose(self) -> None:
+        await self.async_mixpanel.aclose()
+        if self._scoring_pool is not None:
+            self._scoring_pool.shutdown(wait=False, cancel_futures=True)
+            self._scoring_pool = None
+
+
+_worker_engine: Optional[UserBehaviorAnalysisEngine] = None
+
+
+def _init_worker_engine(clock: Callable[[], datetime]) -> None:
+    """Pool initializer: worker engines read time from the same clock as the engine owning the pool."""
+    global _worker_engine
+    _worker_engine = UserBehaviorAnalysisEngine(clock=clock)
+
+
+def _get_worker_engine() -> UserBehaviorAnalysisEngine:
+    global _worker_engine
+    if _worker_engine is None:
+        _worker_engine = UserBehaviorAnalysisEngine()
+    return _worker_engine
+
+
+def aggregate_cohort_shard(
+    user_ids: List[str], now: datetime, trend_days: int, active_within_days: Optional[int]
+) -> CohortAggregate:
+    """Process pool entry point for one shard of a cohort query."""
+    return _get_worker_engine().aggregate_cohort(user_ids, now, trend_days, active_within_days)
+
+
+def score_user_events(user_id: str, events: Union[List[UserEvent], EventBatch]) -> UserProfile:
+    """Process pool entry point; each worker keeps its own engine."""
+    return _get_worker_engine().analyze_user_interests(user_id, events)
+
+
+def materialize_user_interests(user_id: str) -> Tuple[InterestResponse, UserProfile]:
+    """Process pool entry point for the offline materialization job."""
+    engine = _get_worker_engine()
+    user_profile = engine._compute_user_profile(user_id)
+    return engine._build_interest_response(user_id, user_profile), user_profile
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import random
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional
+
+from src.event_batch import EventBatch, EventBatchBuilder, EventRecord
+from src.export_download import RETRYABLE_STATUS_CODES
+from src.metrics import MIXPANEL_EXPORTS, record_stage
+from src.mixpanel_client import DEFAULT_EXPORT_URL, _append_record, _parse_export_record
+
+if TYPE_CHECKING:
+    import httpx
+
+
+class AsyncMixpanelClient:
+    """Non-blocking export client sharing one pooled keep-alive connection set.
+
+    At most ``max_concurrency`` exports run at once; transport errors and
+    retryable status codes are retried with exponential backoff and jitter.
+    """
+
+    def __init__(
+        self,
+        api_secret: str,
+        export_url: str = DEFAULT_EXPORT_URL,
+        max_connections: int = 20,
+        max_concurrency: int = 10,
+        max_retries: int = 3,
+        backoff_seconds: float = 0.5,
+        timeout_seconds: float = 60.0,
+    ):
+        self.api_secret = api_secret
+        self.export_url = export_url
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout_seconds = timeout_seconds
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        # Created lazily so the client and semaphore bind to the running loop
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                auth=(self.api_secret, ""),
+                timeout=self.timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._semaphore = None
+
+    def _retry_delay(self, attempt: int) -> float:
+        return self.backoff_seconds * (2 ** attempt) * (0.5 + random.random() / 2)
+
+    async def _export(self, params: Dict[str, str], user_id: str) -> EventBatch:
+        import httpx
+
+        client = self._get_client()
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    started = time.perf_counter()
+                    parse_seconds = 0.0
+                    async with client.stream("GET", self.export_url, params=params) as response:
+                        if response.status_code in RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                            raise httpx.HTTPStatusError(
+                                f"Retryable status {response.status_code}",
+                                request=response.request,
+                                response=response,
+                            )
+                        response.raise_for_status()
+                        builder = EventBatchBuilder(user_id)
+                        async for line in response.aiter_lines():
+                            parse_started = time.perf_counter()
+                            record = _parse_export_record(line, user_id)
+                            if record is not None:
+                                _append_record(builder, record)
+                            parse_seconds += time.perf_counter() - parse_started
+                    MIXPANEL_EXPORTS.inc(outcome="ok")
+                    record_stage("mixpanel_network", time.perf_counter() - started - parse_seconds)
+                    record_stage("mixpanel_parse", parse_seconds)
+                    return builder.build()
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                retryable = isinstance(e, httpx.TransportError) or e.response.status_code in RETRYABLE_STATUS_CODES
+                if not retryable or attempt >= self.max_retries:
+                    MIXPANEL_EXPORTS.inc(outcome="error")
+                    raise
+                MIXPANEL_EXPORTS.inc(outcome="retry")
+            await asyncio.sleep(self._retry_delay(attempt))
+            attempt += 1
+
+    def _user_params(self, user_id: str, from_date: str, to_date: str, event_names: List[str]) -> Dict[str, str]:
+        return {
+            "from_date": from_date,
+            "to_date": to_date,
+            "event": json.dumps(event_names),
+            "where": json.dumps({"properties[\"distinct_id\"]": user_id}),
+        }
+
+    async def fetch_user_event_batch(
+        self,
+        user_id: str,
+        from_date: str,
+        to_date: str,
+        event_names: List[str],
+    ) -> EventBatch:
+        return await self._export(self._user_params(user_id, from_date, to_date, event_names), user_id)
+
+    async def fetch_user_events(
+        self,
+        user_id: str,
+        from_date: str,
+        to_date: str,
+        event_names: List[str],
+    ) -> List[EventRecord]:
+        batch = await self.fetch_user_event_batch(user_id, from_date, to_date, event_names)
+        return list(batch.iter_records())
+
+    async def iter_user_events(
+        self,
+        user_id: str,
+        from_date: str,
+        to_date: str,
+        event_names: List[str],
+    ) -> AsyncIterator[EventRecord]:
+        """Stream a user's export without retries; events are yielded as lines arrive."""
+        params = self._user_params(user_id, from_date, to_date, event_names)
+        client = self._get_client()
+        network_seconds = 0.0
+        parse_seconds = 0.0
+        try:
+            async with self._semaphore:
+                started = time.perf_counter()
+                async with client.stream("GET", self.export_url, params=params) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        parse_started = time.perf_counter()
+                        network_seconds += parse_started - started
+                        record = _parse_export_record(line, user_id)
+                        parse_seconds += time.perf_counter() - parse_started
+                        if record is not None:
+                            yield record
+                        # Time the consumer spends on a record counts towards neither stage
+                        started = time.perf_counter()
+                network_seconds += time.perf_counter() - started
+        except Exception:
+            MIXPANEL_EXPORTS.inc(outcome="error")
+            raise
+        else:
+            MIXPANEL_EXPORTS.inc(outcome="ok")
+        finally:
+            record_stage("mixpanel_network", network_seconds)
+            record_stage("mixpanel_parse", parse_seconds)
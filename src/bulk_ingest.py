@@ -0,0 +1,105 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from src.cohort_analytics import CohortAggregate, last_rollup_within
+from src.daily_rollups import RollupBuilder
+from src.event_batch import EventRecord
+from src.event_store import EventStore
+from src.export_download import create_export_downloader
+from src.interest_aggregator import InterestAggregator
+from src.mixpanel_client import iter_export_events
+from src.models import UserProfile
+from config.settings import settings
+
+
+def default_window() -> Tuple[date, date]:
+    to_date = datetime.utcnow().date()
+    from_date = to_date - timedelta(days=settings.MIXPANEL_DEFAULT_WINDOW_DAYS)
+    return from_date, to_date
+
+
+def iter_bulk_export(from_day: date, to_day: date) -> Iterable[EventRecord]:
+    """One unfiltered export for all users instead of one filtered export per user."""
+    return iter_export_events(
+        from_date=from_day.isoformat(),
+        to_date=to_day.isoformat(),
+        event_names=settings.MIXPANEL_DEFAULT_EVENTS,
+        api_secret=settings.MIXPANEL_API_SECRET,
+        export_url=settings.MIXPANEL_EXPORT_URL,
+        downloader=create_export_downloader(),
+    )
+
+
+def ingest_into_store(
+    store: EventStore,
+    from_day: date,
+    to_day: date,
+    events: Optional[Iterable[EventRecord]] = None,
+) -> int:
+    """Stream the export once into the event store; returns the number of events written."""
+    if events is None:
+        events = iter_bulk_export(from_day, to_day)
+    return store.replace_all_events(from_day, to_day, events)
+
+
+def ingest_into_aggregators(
+    engine,
+    from_day: date,
+    to_day: date,
+    user_ids: Optional[Set[str]] = None,
+    events: Optional[Iterable[EventRecord]] = None,
+) -> Dict[str, UserProfile]:
+    """Demultiplex one export stream by distinct_id into per-user profiles.
+
+    Events of users outside ``user_ids`` (when given) are skipped. Every
+    requested user gets a profile, even if the export had no events for them.
+    """
+    if events is None:
+        events = iter_bulk_export(from_day, to_day)
+
+    aggregators: Dict[str, InterestAggregator] = {}
+    if user_ids is not None:
+        for user_id in user_ids:
+            aggregators[user_id] = engine.create_aggregator()
+
+    for event in events:
+        aggregator = aggregators.get(event.user_id)
+        if aggregator is None:
+            if user_ids is not None:
+                continue
+            aggregator = aggregators[event.user_id] = engine.create_aggregator()
+        aggregator.add(event)
+
+    return {user_id: aggregator.build_profile(user_id) for user_id, aggregator in aggregators.items()}
+
+
+def ingest_into_cohort(
+    engine,
+    from_day: date,
+    to_day: date,
+    user_ids: List[str],
+    now: datetime,
+    trend_days: int,
+    active_within_days: Optional[int] = None,
+    events: Optional[Iterable[EventRecord]] = None,
+) -> CohortAggregate:
+    """Map step of a cohort query over one export stream instead of one export per user.
+
+    Events are demultiplexed into per-user daily rollups, so memory is
+    bounded by distinct (day, type, item) keys rather than events.
+    """
+    if events is None:
+        events = iter_bulk_export(from_day, to_day)
+
+    builders = {user_id: RollupBuilder() for user_id in user_ids}
+    for event in events:
+        builder = builders.get(event.user_id)
+        if builder is not None:
+            builder.add(event)
+
+    aggregate = CohortAggregate()
+    for builder in builders.values():
+        rows = builder.rows()
+        if last_rollup_within(rows, now, active_within_days):
+            aggregate.add_rollups(rows, engine.vectorized_scorer, now, trend_days)
+    return aggregate
@@ -0,0 +1,159 @@
+import math
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.daily_rollups import EVENTS_KIND, RollupRow
+from src.event_batch import DAY_US, EventBatch, to_epoch_us
+from src.interest_matrix import Vocabulary
+from src.models import CohortItem, InterestKind
+from src.vectorized_engine import VectorizedInterestScorer, top_k_positions
+
+
+# Per-item columns of CohortAggregate.values
+SCORE, USERS, RECENT, PREVIOUS = range(4)
+VALUE_COLUMNS = 4
+
+
+class CohortAggregate:
+    """Mergeable partial result of a cohort query.
+
+    For every tag and tool it holds the summed decayed scores of the
+    users for whom the item is an interest (the same scores and
+    MIN_INTERACTIONS cut-off as their profiles), how many users that is,
+    and the undecayed event weight in the latest trend window and in the
+    window before it. Aggregates of disjoint user sets merge by addition,
+    so shards can be computed anywhere and reduced in any order.
+    """
+
+    def __init__(self):
+        self.users = 0
+        self.total_events = 0
+        self.vocabularies: Dict[InterestKind, Vocabulary] = {kind: Vocabulary() for kind in InterestKind}
+        self.values: Dict[InterestKind, np.ndarray] = {
+            kind: np.zeros((0, VALUE_COLUMNS), dtype=np.float64) for kind in InterestKind
+        }
+
+    def _add_values(self, kind: InterestKind, names: List[str], values: np.ndarray) -> None:
+        vocabulary = self.vocabularies[kind]
+        rows = np.array([vocabulary.add(name) for name in names], dtype=np.int64)
+        current = self.values[kind]
+        if len(vocabulary) > len(current):
+            current = np.vstack([current, np.zeros((len(vocabulary) - len(current), VALUE_COLUMNS))])
+            self.values[kind] = current
+        # Names are unique within a batch or aggregate, so rows never repeat
+        current[rows] += values
+
+    def add_batch(
+        self, batch: EventBatch, scorer: VectorizedInterestScorer, now: datetime, trend_days: int
+    ) -> None:
+        """Fold one user's events into the aggregate."""
+        self.users += 1
+        self.total_events += len(batch)
+        if not len(batch):
+            return
+
+        decayed = scorer.event_scores(batch, now)
+        raw = scorer.type_weights[batch.event_types]
+        age = to_epoch_us(now) - batch.timestamps
+        window = trend_days * DAY_US
+        recent = np.where(age < window, raw, 0.0)
+        previous = np.where((age >= window) & (age < 2 * window), raw, 0.0)
+
+        # Tags and tools in one pass: tool codes are shifted past the tag codes
+        tag_count = len(batch.tag_names)
+        size = tag_count + len(batch.tool_names)
+        codes = np.concatenate([batch.tag_codes, batch.tool_codes + tag_count])
+        events = np.arange(len(batch), dtype=np.int64)
+        positions = np.concatenate([
+            np.repeat(events, np.diff(batch.tag_offsets)),
+            np.repeat(events, np.diff(batch.tool_offsets)),
+        ])
+        interest = np.bincount(codes, minlength=size) >= scorer.min_interactions
+        values = np.empty((size, VALUE_COLUMNS), dtype=np.float64)
+        values[:, SCORE] = np.bincount(codes, weights=decayed[positions], minlength=size) * interest
+        values[:, USERS] = interest
+        values[:, RECENT] = np.bincount(codes, weights=recent[positions], minlength=size)
+        values[:, PREVIOUS] = np.bincount(codes, weights=previous[positions], minlength=size)
+        self._add_values(InterestKind.TAG, batch.tag_names, values[:tag_count])
+        self._add_values(InterestKind.TOOL, batch.tool_names, values[tag_count:])
+
+    def add_rollups(
+        self, rows: List[RollupRow], scorer: VectorizedInterestScorer, now: datetime, trend_days: int
+    ) -> None:
+        """Fold one user's daily rollups into the aggregate.
+
+        Ages are whole calendar days before ``now``'s day, as in
+        RollupScores, so scores and trend windows can differ slightly from
+        add_batch for events late in a day.
+        """
+        self.users += 1
+        items: Dict[InterestKind, Dict[str, list]] = {kind: {} for kind in InterestKind}
+        for row in rows:
+            if row.kind == EVENTS_KIND:
+                self.total_events += row.count
+                continue
+            if row.kind not in (InterestKind.TAG.value, InterestKind.TOOL.value):
+                continue
+            age = (now.date() - row.day).days
+            raw = row.count * scorer.event_weights.get(row.event_type, 1.0)
+            entry = items[InterestKind(row.kind)].setdefault(row.item, [0.0, 0, 0.0, 0.0])
+            entry[0] += raw * math.exp(-scorer.time_decay_factor * age)
+            entry[1] += row.count
+            if age < trend_days:
+                entry[2] += raw
+            elif age < 2 * trend_days:
+                entry[3] += raw
+
+        for kind, entries in items.items():
+            if not entries:
+                continue
+            values = np.empty((len(entries), VALUE_COLUMNS), dtype=np.float64)
+            for position, (score, interactions, recent, previous) in enumerate(entries.values()):
+                interest = interactions >= scorer.min_interactions
+                values[position] = (score * interest, interest, recent, previous)
+            self._add_values(kind, list(entries), values)
+
+    def merge(self, other: "CohortAggregate") -> "CohortAggregate":
+        self.users += other.users
+        self.total_events += other.total_events
+        for kind in InterestKind:
+            self._add_values(kind, other.vocabularies[kind].names, other.values[kind])
+        return self
+
+    def top_items(self, kind: InterestKind, limit: int) -> List[CohortItem]:
+        """Items ranked by summed score; share is the item's fraction of all scores of its kind."""
+        values = self.values[kind]
+        names = self.vocabularies[kind].names
+        total_score = float(values[:, SCORE].sum())
+        items = []
+        for row in top_k_positions(values[:, SCORE], limit).tolist():
+            score, users, recent, previous = values[row].tolist()
+            if score <= 0:
+                break
+            items.append(CohortItem(
+                name=names[row],
+                score=score,
+                share=score / total_score,
+                users=int(users),
+                user_share=users / self.users,
+                recent_weight=recent,
+                previous_weight=previous,
+                trend=(recent - previous) / previous if previous > 0 else None,
+            ))
+        return items
+
+
+def last_activity_within(batch: EventBatch, now: datetime, days: Optional[int]) -> bool:
+    if days is None:
+        return True
+    return bool(len(batch)) and int(batch.timestamps.max()) >= to_epoch_us(now) - days * DAY_US
+
+
+def last_rollup_within(rows: List[RollupRow], now: datetime, days: Optional[int]) -> bool:
+    """last_activity_within for a user's rollups; the event rows carry the latest timestamp of each day."""
+    if days is None:
+        return True
+    latest = max((row.last_timestamp for row in rows if row.kind == EVENTS_KIND), default=None)
+    return latest is not None and to_epoch_us(latest) >= to_epoch_us(now) - days * DAY_US
@@ -0,0 +1,313 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+from src.metrics import stage
+from src.user_directory import EMAIL_COLUMN, NAME_COLUMN, TOTAL_EVENTS_COLUMN, USER_ID_COLUMN
+from src.vectorized_engine import top_k_positions
+
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+# Times a reader re-resolves the directory link when a rebuild removes the build it was opening
+LOAD_ATTEMPTS = 5
+# Per-row columns in file order, then the ID index sorted for binary search
+COLUMNS = ("user_ids", "emails", "names", "total_events", "sorted_ids", "sorted_positions")
+
+
+class _Snapshot(NamedTuple):
+    """Columns of one build; replaced whole so readers never mix two builds."""
+
+    version: Tuple[str, int, int]
+    columns: Dict[str, np.ndarray]
+    summaries: Dict[int, Dict]
+
+
+def _encode(values: "pd.Series") -> np.ndarray:
+    """Fixed-width UTF-8 bytes; numpy strips trailing NULs, so values round-trip."""
+    return np.char.encode(values.fillna("").astype(str).to_numpy(dtype=str), "utf-8")
+
+
+def build_columnar_users(csv_file_path: str, output_dir: str) -> int:
+    """Convert users.csv into the memory-mappable layout read by ColumnarUserDirectory.
+
+    Only the four columns the API serves are kept. Each build is written to
+    its own sibling directory and output_dir is a symlink swapped to it with
+    one rename, so readers never see a partial or mixed directory. Returns
+    the number of rows.
+    """
+    import pandas as pd
+
+    stat = os.stat(csv_file_path)
+    df = pd.read_csv(
+        csv_file_path,
+        usecols=[USER_ID_COLUMN, EMAIL_COLUMN, NAME_COLUMN, TOTAL_EVENTS_COLUMN],
+        dtype={USER_ID_COLUMN: str, EMAIL_COLUMN: str, NAME_COLUMN: str},
+        keep_default_na=False,
+    )
+
+    user_ids = _encode(df[USER_ID_COLUMN])
+    # Stable sort: among duplicated IDs the first row sorts first, matching UserDirectory
+    order = np.argsort(user_ids, kind="stable")
+    columns = {
+        "user_ids": user_ids,
+        "emails": _encode(df[EMAIL_COLUMN]),
+        "names": _encode(df[NAME_COLUMN]),
+        "total_events": pd.to_numeric(df[TOTAL_EVENTS_COLUMN], errors="coerce").fillna(0).to_numpy(dtype=np.int64),
+        "sorted_ids": user_ids[order],
+        "sorted_positions": order.astype(np.int64),
+    }
+
+    base = output_dir.rstrip(os.sep)
+    build_dir = f"{base}.build-{time.time_ns()}-{os.getpid()}"
+    os.makedirs(build_dir)
+    for name in COLUMNS:
+        np.save(os.path.join(build_dir, f"{name}.npy"), columns[name])
+    with open(os.path.join(build_dir, META_FILE), "w") as f:
+        json.dump({
+            "format_version": FORMAT_VERSION,
+            "rows": len(df),
+            "source": os.path.abspath(csv_file_path),
+            "source_mtime_ns": stat.st_mtime_ns,
+            "source_size": stat.st_size,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        }, f)
+
+    # output_dir is a symlink to the current build, swapped with a single rename
+    previous = os.path.realpath(output_dir) if os.path.islink(output_dir) else None
+    if os.path.isdir(output_dir) and not os.path.islink(output_dir):
+        # Directory written by an older version; replaced once, non-atomically
+        shutil.rmtree(output_dir)
+    link = f"{base}.link-{os.getpid()}"
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.basename(build_dir), link)
+    os.replace(link, output_dir)
+
+    # Keep the previous build for readers that resolved the link just before the swap
+    keep = {os.path.realpath(build_dir), previous}
+    prefix = f"{os.path.basename(base)}.build-"
+    parent = os.path.dirname(os.path.abspath(base))
+    for entry in os.listdir(parent):
+        path = os.path.join(parent, entry)
+        if entry.startswith(prefix) and os.path.realpath(path) not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+    return len(df)
+
+
+def columnar_users_stale(csv_file_path: str, output_dir: str) -> bool:
+    """True if output_dir is missing, unreadable or was built from another version of the CSV."""
+    try:
+        with open(os.path.join(output_dir, META_FILE)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return True
+    stat = os.stat(csv_file_path)
+    return (
+        meta.get("format_version") != FORMAT_VERSION
+        or meta.get("source_mtime_ns") != stat.st_mtime_ns
+        or meta.get("source_size") != stat.st_size
+    )
+
+
+def watch_users_csv(csv_file_path: str, output_dir: str, interval_seconds: float) -> threading.Thread:
+    """Rebuild output_dir in a daemon thread whenever the CSV changes.
+
+    Meant for the process that owns the directory (the multi-worker
+    supervisor); readers pick up the new snapshot on their next request.
+    """
+    def run() -> None:
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                if os.path.exists(csv_file_path) and columnar_users_stale(csv_file_path, output_dir):
+                    build_columnar_users(csv_file_path, output_dir)
+            except Exception:
+                # Keep serving the previous snapshot; the next change or tick retries
+                logging.getLogger(__name__).exception("Rebuilding %s from %s failed", output_dir, csv_file_path)
+
+    thread = threading.Thread(target=run, name="users-csv-watcher", daemon=True)
+    thread.start()
+    return thread
+
+
+class ColumnarUserDirectory:
+    """Users directory served from memory-mapped NumPy columns.
+
+    Drop-in for UserDirectory: opening is O(1) because nothing is parsed
+    and pages are loaded by the OS on first touch. ID lookups are a binary
+    search over the sorted ID column. The directory is reopened when the
+    ingest job replaces it.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+
+    def _file_version(self) -> Tuple[str, int, int]:
+        # Resolve the link once so meta.json and every column come from the same build
+        build_dir = os.path.realpath(self.directory)
+        stat = os.stat(os.path.join(build_dir, META_FILE))
+        return build_dir, stat.st_mtime_ns, stat.st_ino
+
+    def _load(self, version: Tuple[str, int, int]) -> None:
+        build_dir = version[0]
+        try:
+            with stage("load_user_data"):
+                with open(os.path.join(build_dir, META_FILE)) as f:
+                    meta = json.load(f)
+                if meta.get("format_version") != FORMAT_VERSION:
+                    raise ValueError(f"unsupported format version {meta.get('format_version')}")
+                columns = {
+                    name: np.load(os.path.join(build_dir, f"{name}.npy"), mmap_mode="r")
+                    for name in COLUMNS
+                }
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error loading data: {e}")
+
+        self._snapshot = _Snapshot(version, columns, {})
+
+    def refresh(self) -> _Snapshot:
+        """Reopen the directory if it was rebuilt and return the snapshot to read from."""
+        for attempt in range(LOAD_ATTEMPTS):
+            try:
+                version = self._file_version()
+                snapshot = self._snapshot
+                if snapshot is not None and snapshot.version == version:
+                    return snapshot
+                with self._lock:
+                    if self._snapshot is None or self._snapshot.version != version:
+                        self._load(version)
+                    return self._snapshot
+            except FileNotFoundError as e:
+                # A newer build replaced this one mid-load; resolve the link again
+                error = e
+        # The open snapshot stays valid while rebuilds keep racing us
+        if self._snapshot is None:
+            raise Exception(f"Error loading data: {error}")
+        return self._snapshot
+
+    @property
+    def version(self) -> Optional[Tuple[str, int, int]]:
+        return self.refresh().version
+
+    def __len__(self) -> int:
+        return len(self.refresh().columns["user_ids"])
+
+    def __contains__(self, user_id: str) -> bool:
+        return self.get(user_id) is not None
+
+    @staticmethod
+    def _positions(columns: Dict[str, np.ndarray], user_ids: List[str]) -> np.ndarray:
+        """Row position per ID, -1 where the ID is unknown."""
+        sorted_ids = columns["sorted_ids"]
+        if not user_ids or not len(sorted_ids):
+            return np.full(len(user_ids), -1, dtype=np.int64)
+        keys = np.array([user_id.encode("utf-8") for user_id in user_ids], dtype=bytes)
+        slots = np.searchsorted(sorted_ids, keys, side="left")
+        in_range = slots < len(sorted_ids)
+        found = np.zeros(len(user_ids), dtype=bool)
+        found[in_range] = sorted_ids[slots[in_range]] == keys[in_range]
+        return np.where(found, columns["sorted_positions"][np.minimum(slots, len(sorted_ids) - 1)], -1)
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        columns = self.refresh().columns
+        position = int(self._positions(columns, [user_id])[0])
+        if position < 0:
+            return None
+        return self._row(columns, position)
+
+    @staticmethod
+    def _row(columns: Dict[str, np.ndarray], position: int) -> Dict:
+        return {
+            "user_id": columns["user_ids"][position].decode("utf-8"),
+            "email": columns["emails"][position].decode("utf-8"),
+            "name": columns["names"][position].decode("utf-8"),
+            "total_events": int(columns["total_events"][position]),
+        }
+
+    def get_many(self, user_ids: List[str]) -> Dict[str, Optional[Dict]]:
+        """Look up several IDs against a single snapshot of the directory."""
+        columns = self.refresh().columns
+        positions = self._positions(columns, user_ids).tolist()
+        return {
+            user_id: None if position < 0 else self._row(columns, position)
+            for user_id, position in zip(user_ids, positions)
+        }
+
+    @staticmethod
+    def _records(columns: Dict[str, np.ndarray], positions: np.ndarray) -> List[Dict]:
+        return [
+            {"user_id": user_id, "email": email, "name": name, "total_events": total_events}
+            for user_id, email, name, total_events in zip(
+                np.char.decode(columns["user_ids"][positions], "utf-8").tolist(),
+                np.char.decode(columns["emails"][positions], "utf-8").tolist(),
+                np.char.decode(columns["names"][positions], "utf-8").tolist(),
+                np.asarray(columns["total_events"][positions]).tolist(),
+            )
+        ]
+
+    def user_ids(self, min_total_events: Optional[int] = None, max_total_events: Optional[int] = None) -> List[str]:
+        """IDs of users whose event total is within the given bounds."""
+        columns = self.refresh().columns
+        total_events = np.asarray(columns["total_events"])
+        mask = np.ones(len(total_events), dtype=bool)
+        if min_total_events is not None:
+            mask &= total_events >= min_total_events
+        if max_total_events is not None:
+            mask &= total_events <= max_total_events
+        return np.char.decode(columns["user_ids"][mask], "utf-8").tolist()
+
+    def all_users(self) -> List[Dict]:
+        columns = self.refresh().columns
+        return self._records(columns, np.arange(len(columns["user_ids"])))
+
+    def page(self, offset: int, limit: int) -> List[Dict]:
+        columns = self.refresh().columns
+        total = len(columns["user_ids"])
+        return self._records(columns, np.arange(min(offset, total), min(offset + limit, total)))
+
+    def summary(self, top_n: int = 5) -> Dict:
+        """Totals and most active users, computed once per directory version."""
+        snapshot = self.refresh()
+        summary = snapshot.summaries.get(top_n)
+        if summary is None:
+            total_events_column = snapshot.columns["total_events"]
+            total_users = len(total_events_column)
+            total_events = int(total_events_column.sum())
+            summary = {
+                "total_users": total_users,
+                "total_events": total_events,
+                "average_events_per_user": round(total_events / total_users, 2) if total_users > 0 else 0,
+                "most_active_users": self._records(
+                    snapshot.columns, top_k_positions(np.asarray(total_events_column), top_n)
+                ),
+            }
+            snapshot.summaries[top_n] = summary
+        return summary
+
+
+_directories: Dict[str, ColumnarUserDirectory] = {}
+_directories_lock = threading.Lock()
+
+
+def get_columnar_user_directory(directory: str) -> ColumnarUserDirectory:
+    """Return the process-wide columnar directory for a path, creating it on first use."""
+    users = _directories.get(directory)
+    if users is None:
+        with _directories_lock:
+            users = _directories.setdefault(directory, ColumnarUserDirectory(directory))
+    return users
@@ -0,0 +1,119 @@
+import math
+from collections import Counter
+from datetime import date, datetime, time
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from src.event_batch import EventRecord
+from src.interest_aggregator import InterestAggregator, _ItemStats
+from src.models import EventType, InterestKind
+
+
+# Kind of the rows counting the events themselves (item is empty), so that
+# total_events survives events without tags or tools
+EVENTS_KIND = "*"
+# Kind of the rows listing completed tutorials (item is the tutorial ID)
+COMPLETED_KIND = "completed"
+
+
+class RollupRow(NamedTuple):
+    """Events of one calendar day and type that touched one item."""
+
+    day: date
+    event_type: str
+    kind: str
+    item: str
+    count: int
+    last_timestamp: datetime
+
+
+class RollupBuilder:
+    """Accumulates one user's (day, event_type, kind, item) counts from events fed one at a time."""
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.last: Dict[Tuple[date, str, str, str], datetime] = {}
+
+    def _touch(self, key: Tuple[date, str, str, str], timestamp: datetime) -> None:
+        self.counts[key] += 1
+        if key not in self.last or timestamp > self.last[key]:
+            self.last[key] = timestamp
+
+    def add(self, event: EventRecord) -> None:
+        day = event.timestamp.date()
+        event_type = event.event_type.value
+        self._touch((day, event_type, EVENTS_KIND, ""), event.timestamp)
+        if event.event_type == EventType.COMPLETED:
+            self._touch((day, event_type, COMPLETED_KIND, event.tutorial_id), event.timestamp)
+        for tag in event.tags:
+            self._touch((day, event_type, InterestKind.TAG.value, tag), event.timestamp)
+        for tool in event.tools:
+            self._touch((day, event_type, InterestKind.TOOL.value, tool), event.timestamp)
+
+    def rows(self) -> List[RollupRow]:
+        return [RollupRow(*key, count, self.last[key]) for key, count in self.counts.items()]
+
+
+def rollup_events(events: Iterable[EventRecord]) -> List[RollupRow]:
+    """Compact a user's events into (day, event_type, kind, item) -> count rows."""
+    builder = RollupBuilder()
+    for event in events:
+        builder.add(event)
+    return builder.rows()
+
+
+class RollupScores(InterestAggregator):
+    """Tag/tool scores computed from daily rollup rows instead of raw events.
+
+    Ages are whole calendar days before the reference day, so the profile
+    equals scoring the raw events at the last microsecond of that day:
+    every event in a row has the same weight and decay, and a row adds
+    ``count`` of them at once. Scores agree up to floating-point summation
+    order; counts and last interactions are exact for events stored in
+    time order.
+    """
+
+    def __init__(
+        self,
+        event_weights: Dict[str, float],
+        time_decay_factor: float,
+        min_interactions: int,
+        max_top_items: int,
+        reference_day: date,
+    ):
+        super().__init__(
+            event_weights, time_decay_factor, min_interactions, max_top_items,
+            now=datetime.combine(reference_day, time.max),
+        )
+        self.reference_day = reference_day
+        self.rows = 0
+
+    def _day_decay(self, day: date) -> float:
+        days_ago = (self.reference_day - day).days
+        decay = self._decay_by_days.get(days_ago)
+        if decay is None:
+            decay = math.exp(-self.time_decay_factor * days_ago)
+            self._decay_by_days[days_ago] = decay
+        return decay
+
+    def add_rollup(self, row: RollupRow) -> None:
+        self.rows += 1
+        if row.kind == EVENTS_KIND:
+            self.total_events += row.count
+            return
+        if row.kind == COMPLETED_KIND:
+            self.completed.add(row.item)
+            return
+
+        items = self.tags if row.kind == InterestKind.TAG.value else self.tools
+        stats = items.get(row.item)
+        if stats is None:
+            stats = items[row.item] = _ItemStats()
+        stats.score += row.count * self.event_weights.get(row.event_type, 1.0) * self._day_decay(row.day)
+        stats.interactions += row.count
+        if stats.last_interaction is None or row.last_timestamp > stats.last_interaction:
+            stats.last_interaction = row.last_timestamp
+
+    def add_rollups(self, rows: Iterable[RollupRow]) -> "RollupScores":
+        for row in rows:
+            self.add_rollup(row)
+        return self
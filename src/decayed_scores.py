@@ -0,0 +1,279 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional, Set
+
+from src.event_batch import EventRecord
+from src.interest_aggregator import InterestAggregator, _ItemStats
+from src.models import UserProfile
+
+
+# Bumped when the stored payload changes shape; older payloads are rebuilt from the window
+PAYLOAD_VERSION = 3
+
+
+class _DayBucket:
+    """One event day's undecayed contributions, kept until the day leaves the window."""
+
+    __slots__ = ("events", "tags", "tools", "completed")
+
+    def __init__(self):
+        self.events = 0
+        # name -> [summed event weight, interactions, last interaction]
+        self.tags: Dict[str, list] = {}
+        self.tools: Dict[str, list] = {}
+        self.completed: Set[str] = set()
+
+    def state(self) -> tuple:
+        return self.events, self.tags, self.tools, self.completed
+
+
+class DecayedScores(InterestAggregator):
+    """Tag/tool scores held at a reference day and decayed forward in closed form.
+
+    A score stored at reference day R is worth ``score * exp(-k * (D - R))``
+    at day D, so new events are folded in with O(1) work each and a read
+    only rescales the stored items instead of replaying the history.
+
+    Ages are counted in whole calendar days, which is what
+    calculate_time_decay yields when evaluated at the last microsecond of
+    the reference day. Like live scoring, only the last ``window_days``
+    days count: undecayed per-day totals are kept alongside the scores,
+    and when days fall out of the window the scores, interaction counts
+    and event total are rebuilt from the days that remain.
+    """
+
+    def __init__(
+        self,
+        event_weights: Dict[str, float],
+        time_decay_factor: float,
+        min_interactions: int,
+        max_top_items: int,
+        reference_day: date,
+        window_days: int,
+    ):
+        super().__init__(event_weights, time_decay_factor, min_interactions, max_top_items)
+        self.reference_day = reference_day
+        self.window_days = window_days
+        self.watermark: Optional[datetime] = None
+        self.days: Dict[date, _DayBucket] = {}
+
+    def _decay(self, event_time: datetime) -> float:
+        return self._day_decay(event_time.date())
+
+    def _day_decay(self, day: date) -> float:
+        days_ago = (self.reference_day - day).days
+        decay = self._decay_by_days.get(days_ago)
+        if decay is None:
+            decay = math.exp(-self.time_decay_factor * days_ago)
+            self._decay_by_days[days_ago] = decay
+        return decay
+
+    def window_start(self) -> date:
+        return self.reference_day - timedelta(days=self.window_days)
+
+    def advance_to(self, day: date) -> None:
+        """Move the reference day forward, decaying every stored score and expiring days outside the window."""
+        elapsed = (day - self.reference_day).days
+        if elapsed <= 0:
+            return
+        self.reference_day = day
+        self._decay_by_days = {}
+        expired = [bucket_day for bucket_day in self.days if bucket_day < self.window_start()]
+        if expired:
+            for bucket_day in expired:
+                del self.days[bucket_day]
+            self._rebuild()
+            return
+        factor = math.exp(-self.time_decay_factor * elapsed)
+        for items in (self.tags, self.tools):
+            for stats in items.values():
+                stats.score *= factor
+
+    def _rebuild(self) -> None:
+        """Recompute scores and counts from the day buckets at the current reference day."""
+        self.total_events = 0
+        self.tags.clear()
+        self.tools.clear()
+        self.completed.clear()
+        for day, bucket in self.days.items():
+            decay = self._day_decay(day)
+            self.total_events += bucket.events
+            self.completed.update(bucket.completed)
+            for target, entries in ((self.tags, bucket.tags), (self.tools, bucket.tools)):
+                for name, (weight, interactions, last_interaction) in entries.items():
+                    stats = target.get(name)
+                    if stats is None:
+                        stats = target[name] = _ItemStats()
+                    stats.score += weight * decay
+                    stats.interactions += interactions
+                    if stats.last_interaction is None or last_interaction > stats.last_interaction:
+                        stats.last_interaction = last_interaction
+
+    def _add(self, event_type: str, timestamp: datetime, tags: Iterable[str], tools: Iterable[str]) -> None:
+        day = timestamp.date()
+        self.advance_to(day)
+        if self.watermark is None or timestamp > self.watermark:
+            self.watermark = timestamp
+        if day < self.window_start():
+            return
+        super()._add(event_type, timestamp, tags, tools)
+
+        bucket = self._bucket(day)
+        bucket.events += 1
+        weight = self.event_weights.get(event_type, 1.0)
+        for entries, names in ((bucket.tags, tags), (bucket.tools, tools)):
+            for name in names:
+                entry = entries.get(name)
+                if entry is None:
+                    entries[name] = [weight, 1, timestamp]
+                else:
+                    entry[0] += weight
+                    entry[1] += 1
+                    entry[2] = timestamp
+
+    def _bucket(self, day: date) -> _DayBucket:
+        bucket = self.days.get(day)
+        if bucket is None:
+            bucket = self.days[day] = _DayBucket()
+        return bucket
+
+    def _complete(self, tutorial_id: str, timestamp: datetime) -> None:
+        day = timestamp.date()
+        if day < self.window_start():
+            return
+        self._bucket(day).completed.add(tutorial_id)
+        self.completed.add(tutorial_id)
+
+    def resume_day(self) -> date:
+        """First day an update has to re-read: the watermark's day, or the whole window before any event."""
+        if self.watermark is None:
+            return self.window_start()
+        return max(self.watermark.date(), self.window_start())
+
+    def refold_days(self, from_day: date, events: Iterable[EventRecord]) -> bool:
+        """Replace the days from ``from_day`` on with ``events``; True if the state changed.
+
+        Events of those days are re-read rather than filtered by watermark,
+        so events that reach the source late are still counted as long as
+        they are not older than ``from_day``. Earlier events are skipped.
+        """
+        previous = {day: self.days.pop(day) for day in list(self.days) if day >= from_day}
+        if previous:
+            self._rebuild()
+        for event in events:
+            if event.timestamp.date() >= from_day:
+                self.add(event)
+        current = {day: bucket for day, bucket in self.days.items() if day >= from_day}
+        return {day: bucket.state() for day, bucket in previous.items()} != {
+            day: bucket.state() for day, bucket in current.items()
+        }
+
+    def build_profile(self, user_id: str, as_of: Optional[date] = None) -> UserProfile:
+        if as_of is not None:
+            self.advance_to(as_of)
+        return super().build_profile(user_id)
+
+    def to_json(self) -> str:
+        def items(values: Dict[str, _ItemStats]):
+            return [
+                [name, stats.score, stats.interactions, stats.last_interaction.isoformat()]
+                for name, stats in values.items()
+            ]
+
+        def entries(values: Dict[str, list]):
+            return [
+                [name, weight, interactions, last_interaction.isoformat()]
+                for name, (weight, interactions, last_interaction) in values.items()
+            ]
+
+        return json.dumps({
+            "version": PAYLOAD_VERSION,
+            "reference_day": self.reference_day.isoformat(),
+            "watermark": self.watermark.isoformat() if self.watermark else None,
+            "total_events": self.total_events,
+            "tags": items(self.tags),
+            "tools": items(self.tools),
+            "days": [
+                [day.isoformat(), bucket.events, entries(bucket.tags), entries(bucket.tools), sorted(bucket.completed)]
+                for day, bucket in self.days.items()
+            ],
+        })
+
+    def load_json(self, payload: str) -> bool:
+        """Restore a saved state; False, leaving this state untouched, for payloads of an older version."""
+        data = json.loads(payload)
+        if data.get("version") != PAYLOAD_VERSION:
+            return False
+        self.reference_day = date.fromisoformat(data["reference_day"])
+        self.watermark = datetime.fromisoformat(data["watermark"]) if data["watermark"] else None
+        self.total_events = data["total_events"]
+        for target, rows in ((self.tags, data["tags"]), (self.tools, data["tools"])):
+            target.clear()
+            for name, score, interactions, last_interaction in rows:
+                stats = target[name] = _ItemStats()
+                stats.score = score
+                stats.interactions = interactions
+                stats.last_interaction = datetime.fromisoformat(last_interaction)
+        self.days = {}
+        self.completed = set()
+        for day, events, tags, tools, completed in data["days"]:
+            bucket = self.days[date.fromisoformat(day)] = _DayBucket()
+            bucket.events = events
+            bucket.completed = set(completed)
+            self.completed.update(completed)
+            for target, rows in ((bucket.tags, tags), (bucket.tools, tools)):
+                for name, weight, interactions, last_interaction in rows:
+                    target[name] = [weight, interactions, datetime.fromisoformat(last_interaction)]
+        self._decay_by_days = {}
+        return True
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS decayed_scores (
+    user_id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class DecayedScoreStore:
+    """Persists each user's DecayedScores state between requests."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, user_id: str, scores: DecayedScores) -> bool:
+        row = self._connection().execute(
+            "SELECT payload FROM decayed_scores WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if row is None:
+            return False
+        return scores.load_json(row[0])
+
+    def save(self, user_id: str, scores: DecayedScores) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO decayed_scores VALUES (?, ?)", (user_id, scores.to_json())
+            )
+
+    def delete(self, user_id: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM decayed_scores WHERE user_id = ?", (user_id,))
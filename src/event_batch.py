@@ -0,0 +1,208 @@
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, NamedTuple
+
+import numpy as np
+
+from src.models import EventType, UserEvent
+
+
+EVENT_TYPES: List[EventType] = list(EventType)
+EVENT_TYPE_CODES: Dict[EventType, int] = {event_type: code for code, event_type in enumerate(EVENT_TYPES)}
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+DAY_US = 86_400_000_000
+
+
+def to_epoch_us(timestamp: datetime) -> int:
+    """Naive wall-clock microseconds since 1970-01-01; aware values are converted to UTC first."""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return (timestamp - EPOCH) // MICROSECOND
+
+
+def from_epoch_us(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=int(value))
+
+
+class EventRecord(NamedTuple):
+    """One event as a plain tuple, for paths that handle events one at a time.
+
+    Field names match UserEvent, so code reading events by attribute
+    accepts either; the Pydantic model is only built at the API boundary.
+    """
+
+    user_id: str
+    tutorial_id: str
+    event_type: EventType
+    timestamp: datetime
+    tags: List[str]
+    tools: List[str]
+
+
+class EventBatch:
+    """One user's events as a struct of arrays.
+
+    Tags, tools and tutorial IDs are interned per batch into integer codes
+    assigned in order of first appearance; per-event tag/tool lists are
+    stored CSR-style as an offsets array plus a flat codes array.
+    Timestamps are int64 microseconds since the epoch. The batch is
+    self-contained, so it pickles cheaply into scoring worker processes.
+    """
+
+    __slots__ = (
+        "user_id",
+        "tutorial_names",
+        "tag_names",
+        "tool_names",
+        "tutorial_codes",
+        "event_types",
+        "timestamps",
+        "tag_offsets",
+        "tag_codes",
+        "tool_offsets",
+        "tool_codes",
+    )
+
+    def __init__(
+        self,
+        user_id: str,
+        tutorial_names: List[str],
+        tag_names: List[str],
+        tool_names: List[str],
+        tutorial_codes: np.ndarray,
+        event_types: np.ndarray,
+        timestamps: np.ndarray,
+        tag_offsets: np.ndarray,
+        tag_codes: np.ndarray,
+        tool_offsets: np.ndarray,
+        tool_codes: np.ndarray,
+    ):
+        self.user_id = user_id
+        self.tutorial_names = tutorial_names
+        self.tag_names = tag_names
+        self.tool_names = tool_names
+        self.tutorial_codes = tutorial_codes
+        self.event_types = event_types
+        self.timestamps = timestamps
+        self.tag_offsets = tag_offsets
+        self.tag_codes = tag_codes
+        self.tool_offsets = tool_offsets
+        self.tool_codes = tool_codes
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    @classmethod
+    def from_events(cls, user_id: str, events: Iterable[EventRecord]) -> "EventBatch":
+        builder = EventBatchBuilder(user_id)
+        for event in events:
+            builder.append(event.tutorial_id, event.event_type, to_epoch_us(event.timestamp), event.tags, event.tools)
+        return builder.build()
+
+    def timestamp_at(self, position: int) -> datetime:
+        return from_epoch_us(self.timestamps[position])
+
+    def completed_tutorial_ids(self) -> List[str]:
+        completed = self.tutorial_codes[self.event_types == EVENT_TYPE_CODES[EventType.COMPLETED]]
+        return sorted(self.tutorial_names[code] for code in np.unique(completed).tolist())
+
+    def iter_records(self) -> Iterator[EventRecord]:
+        tag_offsets = self.tag_offsets.tolist()
+        tool_offsets = self.tool_offsets.tolist()
+        tag_codes = self.tag_codes.tolist()
+        tool_codes = self.tool_codes.tolist()
+        for i, (tutorial_code, event_type, timestamp) in enumerate(
+            zip(self.tutorial_codes.tolist(), self.event_types.tolist(), self.timestamps.tolist())
+        ):
+            yield EventRecord(
+                self.user_id,
+                self.tutorial_names[tutorial_code],
+                EVENT_TYPES[event_type],
+                from_epoch_us(timestamp),
+                [self.tag_names[code] for code in tag_codes[tag_offsets[i]:tag_offsets[i + 1]]],
+                [self.tool_names[code] for code in tool_codes[tool_offsets[i]:tool_offsets[i + 1]]],
+            )
+
+    def to_events(self) -> List[UserEvent]:
+        """Materialize Pydantic events; meant for the API boundary only."""
+        return [UserEvent(**record._asdict()) for record in self.iter_records()]
+
+
+class EventBatchBuilder:
+    """Appends raw event fields into growable lists and freezes them into an EventBatch."""
+
+    __slots__ = (
+        "user_id",
+        "_tutorials",
+        "_tags",
+        "_tools",
+        "_tutorial_codes",
+        "_event_types",
+        "_timestamps",
+        "_tag_offsets",
+        "_tag_codes",
+        "_tool_offsets",
+        "_tool_codes",
+    )
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self._tutorials: Dict[str, int] = {}
+        self._tags: Dict[str, int] = {}
+        self._tools: Dict[str, int] = {}
+        self._tutorial_codes: List[int] = []
+        self._event_types: List[int] = []
+        self._timestamps: List[int] = []
+        self._tag_offsets: List[int] = [0]
+        self._tag_codes: List[int] = []
+        self._tool_offsets: List[int] = [0]
+        self._tool_codes: List[int] = []
+
+    @staticmethod
+    def _intern(names: Dict[str, int], name: str) -> int:
+        code = names.get(name)
+        if code is None:
+            code = names[sys.intern(name)] = len(names)
+        return code
+
+    def append(
+        self,
+        tutorial_id: str,
+        event_type: EventType,
+        timestamp_us: int,
+        tags: Iterable[str],
+        tools: Iterable[str],
+    ) -> None:
+        self._tutorial_codes.append(self._intern(self._tutorials, tutorial_id))
+        self._event_types.append(EVENT_TYPE_CODES[event_type])
+        self._timestamps.append(timestamp_us)
+        for tag in tags:
+            self._tag_codes.append(self._intern(self._tags, tag))
+        self._tag_offsets.append(len(self._tag_codes))
+        for tool in tools:
+            self._tool_codes.append(self._intern(self._tools, tool))
+        self._tool_offsets.append(len(self._tool_codes))
+
+    def build(self) -> EventBatch:
+        return EventBatch(
+            user_id=self.user_id,
+            tutorial_names=list(self._tutorials),
+            tag_names=list(self._tags),
+            tool_names=list(self._tools),
+            tutorial_codes=np.asarray(self._tutorial_codes, dtype=np.int32),
+            event_types=np.asarray(self._event_types, dtype=np.int8),
+            timestamps=np.asarray(self._timestamps, dtype=np.int64),
+            tag_offsets=np.asarray(self._tag_offsets, dtype=np.int64),
+            tag_codes=np.asarray(self._tag_codes, dtype=np.int32),
+            tool_offsets=np.asarray(self._tool_offsets, dtype=np.int64),
+            tool_codes=np.asarray(self._tool_codes, dtype=np.int32),
+        )
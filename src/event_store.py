@@ -0,0 +1,316 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.daily_rollups import COMPLETED_KIND, RollupRow
+from src.event_batch import EventBatch, EventBatchBuilder, EventRecord, to_epoch_us
+from src.models import EventType
+
+
+# Scope used for days that were synced for every user at once (bulk export)
+GLOBAL_SCOPE = "*"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    tutorial_id TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    tools TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_user_day ON events (user_id, day);
+CREATE TABLE IF NOT EXISTS synced_days (
+    scope TEXT NOT NULL,
+    day TEXT NOT NULL,
+    PRIMARY KEY (scope, day)
+);
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    event_day TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    item TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    last_timestamp TEXT NOT NULL,
+    PRIMARY KEY (user_id, day, event_day, event_type, kind, item)
+) WITHOUT ROWID;
+"""
+
+# Completed tutorials of a day range, one row per tutorial (kind COMPLETED_KIND)
+COMPLETED_ROLLUP_SELECT = """
+SELECT user_id, day, substr(timestamp, 1, 10), event_type, '{kind}', tutorial_id, COUNT(*), MAX(timestamp)
+FROM events WHERE {{scope}} day BETWEEN ? AND ? AND event_type = '{event_type}'
+GROUP BY 1, 2, 3, 4, 6
+""".format(kind=COMPLETED_KIND, event_type=EventType.COMPLETED.value)
+
+# Rebuilds daily_rollups from the raw events of a day range. ``day`` is the
+# day the events are filed under (see _event_row), ``event_day`` the date
+# their ages are counted from. The {scope} placeholder narrows it to a user.
+ROLLUP_SELECT = """
+SELECT user_id, day, substr(timestamp, 1, 10), event_type, '*', '', COUNT(*), MAX(timestamp)
+FROM events WHERE {scope} day BETWEEN ? AND ?
+GROUP BY 1, 2, 3, 4
+UNION ALL
+SELECT user_id, day, substr(timestamp, 1, 10), event_type, 'tag', tag.value, COUNT(*), MAX(timestamp)
+FROM events, json_each(events.tags) AS tag WHERE {scope} day BETWEEN ? AND ?
+GROUP BY 1, 2, 3, 4, 6
+UNION ALL
+SELECT user_id, day, substr(timestamp, 1, 10), event_type, 'tool', tool.value, COUNT(*), MAX(timestamp)
+FROM events, json_each(events.tools) AS tool WHERE {scope} day BETWEEN ? AND ?
+GROUP BY 1, 2, 3, 4, 6
+UNION ALL""" + COMPLETED_ROLLUP_SELECT
+
+# PRAGMA user_version of the current layout; 1 added the COMPLETED_KIND rollups
+SCHEMA_VERSION = 1
+
+
+def date_range(from_day: date, to_day: date) -> List[date]:
+    return [from_day + timedelta(days=offset) for offset in range((to_day - from_day).days + 1)]
+
+
+def contiguous_ranges(days: List[date]) -> List[Tuple[date, date]]:
+    ranges: List[Tuple[date, date]] = []
+    for day in sorted(days):
+        if ranges and (day - ranges[-1][1]).days == 1:
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+
+class EventStore:
+    """SQLite-backed local copy of Mixpanel events, synced day by day.
+
+    A day is recorded in synced_days once it is complete (strictly before
+    today, UTC); the current day is always re-fetched since it is still
+    filling up upstream.
+
+    Every write also refreshes daily_rollups, the per user, day, event type
+    and tag/tool counts that RollupScores scores from. compact() drops raw
+    events of old days and keeps only their rollups.
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        self.path = os.path.join(store_dir, "events.sqlite3")
+        self._local = threading.local()
+        os.makedirs(store_dir, exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                self._migrate(conn)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def synced_days(self, user_id: str, from_day: date, to_day: date) -> List[date]:
+        rows = self._connection().execute(
+            "SELECT DISTINCT day FROM synced_days WHERE scope IN (?, ?) AND day BETWEEN ? AND ?",
+            (user_id, GLOBAL_SCOPE, from_day.isoformat(), to_day.isoformat()),
+        ).fetchall()
+        return sorted(date.fromisoformat(row[0]) for row in rows)
+
+    def missing_days(self, user_id: str, from_day: date, to_day: date) -> List[date]:
+        synced = set(self.synced_days(user_id, from_day, to_day))
+        return [day for day in date_range(from_day, to_day) if day not in synced]
+
+    def mark_synced(self, scope: str, days: Iterable[date]) -> None:
+        today = datetime.utcnow().date()
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO synced_days (scope, day) VALUES (?, ?)",
+                [(scope, day.isoformat()) for day in days if day < today],
+            )
+
+    @staticmethod
+    def _event_row(user_id: str, event: EventRecord, from_day: date, to_day: date) -> Tuple:
+        # Events are filed under a day inside the synced range even if their
+        # timestamp's UTC date falls just outside it (project timezone), so a
+        # later re-sync of the range replaces them instead of duplicating.
+        return (
+            user_id,
+            min(max(event.timestamp.date(), from_day), to_day).isoformat(),
+            event.tutorial_id,
+            event.event_type.value,
+            event.timestamp.isoformat(),
+            json.dumps(event.tags),
+            json.dumps(event.tools),
+        )
+
+    def replace_events(self, user_id: str, from_day: date, to_day: date, events: Iterable[EventRecord]) -> int:
+        """Replace the user's stored events for [from_day, to_day] and mark the range synced."""
+        rows = [self._event_row(user_id, event, from_day, to_day) for event in events]
+        with self._connection() as conn:
+            conn.execute(
+                "DELETE FROM events WHERE user_id = ? AND day BETWEEN ? AND ?",
+                (user_id, from_day.isoformat(), to_day.isoformat()),
+            )
+            conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._rollup(conn, user_id, from_day, to_day)
+        self.mark_synced(user_id, date_range(from_day, to_day))
+        return len(rows)
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        # Stores written before rollups existed are backfilled once
+        if conn.execute("SELECT 1 FROM daily_rollups LIMIT 1").fetchone() is None:
+            EventStore._rollup(conn, None, date.min, date.max)
+        else:
+            # Completed-tutorial rows can only be derived from raw events that were not compacted yet
+            conn.execute(
+                "INSERT OR REPLACE INTO daily_rollups " + COMPLETED_ROLLUP_SELECT.format(scope=""),
+                (date.min.isoformat(), date.max.isoformat()),
+            )
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    @staticmethod
+    def _rollup(conn: sqlite3.Connection, user_id: Optional[str], from_day: date, to_day: date) -> None:
+        """Replace the rollups of [from_day, to_day] (one user or all) with counts of the raw events."""
+        scope = "user_id = ? AND" if user_id is not None else ""
+        params = ((user_id,) if user_id is not None else ()) + (from_day.isoformat(), to_day.isoformat())
+        conn.execute(f"DELETE FROM daily_rollups WHERE {scope} day BETWEEN ? AND ?", params)
+        conn.execute(
+            "INSERT INTO daily_rollups " + ROLLUP_SELECT.format(scope=scope), params * 4
+        )
+
+    def replace_all_events(
+        self, from_day: date, to_day: date, events: Iterable[EventRecord], batch_size: int = 10000
+    ) -> int:
+        """Replace every user's events for [from_day, to_day] from one export stream.
+
+        Rows are inserted in batches inside a single transaction, so readers
+        keep seeing the previous data until the whole range is in place.
+        """
+        written = 0
+        batch: List[Tuple] = []
+        with self._connection() as conn:
+            conn.execute(
+                "DELETE FROM events WHERE day BETWEEN ? AND ?",
+                (from_day.isoformat(), to_day.isoformat()),
+            )
+            for event in events:
+                batch.append(self._event_row(event.user_id, event, from_day, to_day))
+                if len(batch) >= batch_size:
+                    conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+                    written += len(batch)
+                    batch = []
+            conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+            written += len(batch)
+            self._rollup(conn, None, from_day, to_day)
+        self.mark_synced(GLOBAL_SCOPE, date_range(from_day, to_day))
+        return written
+
+    def iter_events(self, user_id: str, from_day: date, to_day: date) -> Iterator[EventRecord]:
+        cursor = self._connection().execute(
+            "SELECT tutorial_id, event_type, timestamp, tags, tools FROM events "
+            "WHERE user_id = ? AND day BETWEEN ? AND ? ORDER BY day, rowid",
+            (user_id, from_day.isoformat(), to_day.isoformat()),
+        )
+        for row in cursor:
+            yield self._to_record(user_id, *row)
+
+    @staticmethod
+    def _to_record(user_id: str, tutorial_id: str, event_type: str, timestamp: str, tags: str, tools: str) -> EventRecord:
+        return EventRecord(
+            user_id,
+            tutorial_id,
+            EventType(event_type),
+            datetime.fromisoformat(timestamp),
+            json.loads(tags),
+            json.loads(tools),
+        )
+
+    def get_events(self, user_id: str, from_day: date, to_day: date) -> List[EventRecord]:
+        return list(self.iter_events(user_id, from_day, to_day))
+
+    def get_event_batch(self, user_id: str, from_day: date, to_day: date) -> EventBatch:
+        """Read a user's window straight into an EventBatch, without Pydantic events."""
+        cursor = self._connection().execute(
+            "SELECT tutorial_id, event_type, timestamp, tags, tools FROM events "
+            "WHERE user_id = ? AND day BETWEEN ? AND ? ORDER BY day, rowid",
+            (user_id, from_day.isoformat(), to_day.isoformat()),
+        )
+        builder = EventBatchBuilder(user_id)
+        for tutorial_id, event_type, timestamp, tags, tools in cursor:
+            builder.append(
+                tutorial_id,
+                event_type,
+                to_epoch_us(datetime.fromisoformat(timestamp)),
+                json.loads(tags),
+                json.loads(tools),
+            )
+        return builder.build()
+
+    def iter_rollups(self, user_id: str, from_day: date, to_day: date) -> Iterator[RollupRow]:
+        cursor = self._connection().execute(
+            "SELECT event_day, event_type, kind, item, count, last_timestamp FROM daily_rollups "
+            "WHERE user_id = ? AND day BETWEEN ? AND ?",
+            (user_id, from_day.isoformat(), to_day.isoformat()),
+        )
+        for event_day, event_type, kind, item, count, last_timestamp in cursor:
+            yield RollupRow(
+                date.fromisoformat(event_day), event_type, kind, item, count, datetime.fromisoformat(last_timestamp)
+            )
+
+    def compact(self, before_day: date) -> int:
+        """Delete raw events filed before ``before_day``; their rollups are kept. Returns rows deleted.
+
+        Compacted days can still be scored from rollups, but are no longer
+        returned by iter_events or get_event_batch.
+        """
+        with self._connection() as conn:
+            return conn.execute("DELETE FROM events WHERE day < ?", (before_day.isoformat(),)).rowcount
+
+    def row_counts(self) -> Dict[str, int]:
+        conn = self._connection()
+        return {
+            "events": conn.execute("SELECT COUNT(*) FROM events").fetchone()[0],
+            "daily_rollups": conn.execute("SELECT COUNT(*) FROM daily_rollups").fetchone()[0],
+        }
+
+    def sync_user(
+        self,
+        user_id: str,
+        from_day: date,
+        to_day: date,
+        fetch: Callable[[str, str], Iterable[EventRecord]],
+    ) -> int:
+        """Fetch only the days missing from the store; returns the number of events written.
+
+        ``fetch(from_date, to_date)`` is called once per contiguous run of
+        missing days with ISO date strings, as the export API expects.
+        """
+        written = 0
+        for range_start, range_end in contiguous_ranges(self.missing_days(user_id, from_day, to_day)):
+            events = fetch(range_start.isoformat(), range_end.isoformat())
+            written += self.replace_events(user_id, range_start, range_end, events)
+        return written
+
+    def has_user_data(self, user_id: str, from_day: date, to_day: date) -> bool:
+        return bool(self.synced_days(user_id, from_day, to_day))
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_event_store(store_dir: str) -> EventStore:
+    store: Optional[EventStore] = _stores.get(store_dir)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(store_dir)
+            if store is None:
+                store = _stores[store_dir] = EventStore(store_dir)
+    return store
@@ -0,0 +1,307 @@
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from config.settings import settings
+from src.metrics import MIXPANEL_CHUNKS, MIXPANEL_DOWNLOAD_BYTES, MIXPANEL_DOWNLOAD_THROUGHPUT, record_stage
+
+if TYPE_CHECKING:
+    import requests
+
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Bytes read from the socket per write to the checkpoint file
+READ_BLOCK_BYTES = 64 * 1024
+
+
+class ExportChunk(NamedTuple):
+    from_day: date
+    to_day: date
+
+
+class ClaimedChunk(NamedTuple):
+    """A checkpointed chunk and this download's hard link to it."""
+
+    path: str
+    claim: str
+
+
+def split_window(from_day: date, to_day: date, chunk_days: int) -> List[ExportChunk]:
+    chunks = []
+    start = from_day
+    while start <= to_day:
+        end = min(start + timedelta(days=chunk_days - 1), to_day)
+        chunks.append(ExportChunk(start, end))
+        start = end + timedelta(days=1)
+    return chunks
+
+
+class _RetryableError(Exception):
+    pass
+
+
+class ChunkedExportDownloader:
+    """Downloads a Mixpanel export as date-range chunks fetched in parallel.
+
+    Every chunk is requested gzip-encoded and written to a checkpoint file
+    under ``checkpoint_dir`` as it arrives; the file only gets its final
+    name once the chunk is complete. Chunks are retried on their own with
+    exponential backoff, and chunks already on disk are never downloaded
+    again, so a retry, or a later call after a failed export, fetches only
+    what is missing. Chunks reaching today are always re-fetched since the
+    day is still filling up upstream.
+
+    Checkpoints are shared by concurrent exports with the same filters,
+    so each download reads through its own hard links to them. Removing a
+    checkpoint once its export has been read to the end never pulls a file
+    from under another reader. Checkpoints left behind by failed or
+    abandoned exports are swept once they are older than ``ttl_seconds``.
+    """
+
+    def __init__(
+        self,
+        api_secret: str,
+        export_url: str,
+        checkpoint_dir: str,
+        chunk_days: int = 1,
+        max_workers: int = 4,
+        max_retries: int = 3,
+        backoff_seconds: float = 0.5,
+        timeout_seconds: float = 60.0,
+        ttl_seconds: float = 24 * 3600,
+    ):
+        self.api_secret = api_secret
+        self.export_url = export_url
+        self.checkpoint_dir = checkpoint_dir
+        self.chunk_days = chunk_days
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout_seconds = timeout_seconds
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._sweep_lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def _session(self) -> "requests.Session":
+        # One keep-alive session per download thread
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import requests
+
+            session = self._local.session = requests.Session()
+            session.auth = (self.api_secret, "")
+        return session
+
+    def _export_dir(self, params: Dict[str, str]) -> str:
+        """Checkpoint directory of an export; chunks are shared by exports with the same URL and filters."""
+        filters = {key: value for key, value in params.items() if key not in ("from_date", "to_date")}
+        key = json.dumps({"url": self.export_url, **filters}, sort_keys=True)
+        return os.path.join(self.checkpoint_dir, hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+    def _retry_delay(self, attempt: int) -> float:
+        return self.backoff_seconds * (2 ** attempt) * (0.5 + random.random() / 2)
+
+    def _fetch_chunk(self, params: Dict[str, str], chunk: ExportChunk, path: str, claim: str) -> None:
+        partial = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        started = time.perf_counter()
+        received = 0
+        chunk_params = {**params, "from_date": chunk.from_day.isoformat(), "to_date": chunk.to_day.isoformat()}
+        try:
+            with self._session().get(
+                self.export_url,
+                params=chunk_params,
+                headers={"Accept-Encoding": "gzip"},
+                timeout=self.timeout_seconds,
+                stream=True,
+            ) as response:
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    raise _RetryableError(f"Retryable status {response.status_code}")
+                response.raise_for_status()
+                # Store the body as received; servers ignoring Accept-Encoding get compressed here
+                encoding = response.headers.get("Content-Encoding", "identity").lower()
+                gzipped = encoding == "gzip"
+                check = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+                with (open(partial, "wb") if gzipped else gzip.open(partial, "wb", compresslevel=1)) as out:
+                    for block in response.raw.stream(READ_BLOCK_BYTES, decode_content=False):
+                        out.write(block)
+                        received += len(block)
+                        if check is not None:
+                            check.decompress(block)
+                if check is not None and not check.eof:
+                    raise _RetryableError("Truncated gzip body")
+            # Claim the complete file before publishing it, so no other reader can remove it first
+            os.link(partial, claim)
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        elapsed = time.perf_counter() - started
+        MIXPANEL_DOWNLOAD_BYTES.inc(received, encoding=encoding)
+        if elapsed > 0:
+            MIXPANEL_DOWNLOAD_THROUGHPUT.observe(received / elapsed)
+
+    def _claim_existing(self, path: str, claim: str) -> bool:
+        try:
+            os.link(path, claim)
+        except FileNotFoundError:
+            # Not checkpointed, or removed by another reader since
+            return False
+        # Keep resumed checkpoints from being swept as stale
+        os.utime(claim)
+        return True
+
+    def _download_chunk(self, params: Dict[str, str], chunk: ExportChunk, directory: str, token: str) -> ClaimedChunk:
+        import requests
+        from urllib3.exceptions import HTTPError as TransportError
+
+        path = os.path.join(directory, f"{chunk.from_day.isoformat()}_{chunk.to_day.isoformat()}.ndjson.gz")
+        claimed = ClaimedChunk(path, f"{path}.{token}.read")
+        if chunk.to_day < datetime.utcnow().date() and self._claim_existing(path, claimed.claim):
+            MIXPANEL_CHUNKS.inc(outcome="resumed")
+            return claimed
+
+        attempt = 0
+        while True:
+            try:
+                # A sweep may have removed the directory while it was empty
+                os.makedirs(directory, exist_ok=True)
+                self._fetch_chunk(params, chunk, path, claimed.claim)
+                MIXPANEL_CHUNKS.inc(outcome="ok")
+                return claimed
+            except (_RetryableError, TransportError, requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError):
+                if attempt >= self.max_retries:
+                    MIXPANEL_CHUNKS.inc(outcome="error")
+                    raise
+                MIXPANEL_CHUNKS.inc(outcome="retry")
+            except Exception:
+                MIXPANEL_CHUNKS.inc(outcome="error")
+                raise
+            time.sleep(self._retry_delay(attempt))
+            attempt += 1
+
+    def download(self, params: Dict[str, str]) -> List[ClaimedChunk]:
+        """Fetch every chunk of the export window in ``params``; returns this call's claims in date order.
+
+        The caller reads the claims and passes them to release(). Raises if
+        any chunk still fails after its retries; the chunks that did
+        complete stay checkpointed for the next attempt.
+        """
+        self.sweep_stale()
+        chunks = split_window(
+            date.fromisoformat(params["from_date"]), date.fromisoformat(params["to_date"]), self.chunk_days
+        )
+        directory = self._export_dir(params)
+        token = uuid.uuid4().hex
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(chunks)))) as pool:
+            futures = [pool.submit(self._download_chunk, params, chunk, directory, token) for chunk in chunks]
+        record_stage("mixpanel_download", time.perf_counter() - started)
+
+        failed = [(chunk, future.exception()) for chunk, future in zip(chunks, futures) if future.exception()]
+        if failed:
+            self.release([future.result() for future in futures if not future.exception()], consumed=False)
+            chunk, error = failed[0]
+            raise Exception(
+                f"Mixpanel export failed for {len(failed)}/{len(chunks)} chunks "
+                f"(first: {chunk.from_day}..{chunk.to_day}: {error})"
+            )
+        return [future.result() for future in futures]
+
+    @staticmethod
+    def release(claimed: List[ClaimedChunk], consumed: bool) -> None:
+        """Drop this call's links; with ``consumed``, also the checkpoints unless they were re-downloaded since."""
+        for chunk in claimed:
+            try:
+                if consumed and os.path.samefile(chunk.path, chunk.claim):
+                    os.remove(chunk.path)
+            except FileNotFoundError:
+                pass
+            try:
+                os.remove(chunk.claim)
+            except FileNotFoundError:
+                pass
+
+    def iter_lines(self, params: Dict[str, str]) -> Iterator[bytes]:
+        """Download the export, then yield its NDJSON lines in date order."""
+        claimed = self.download(params)
+        consumed = False
+        try:
+            for chunk in claimed:
+                with gzip.open(chunk.claim, "rb") as lines:
+                    for line in lines:
+                        yield line.rstrip(b"\r\n")
+            consumed = True
+        finally:
+            # An export abandoned midway keeps its checkpoints for the next attempt
+            self.release(claimed, consumed)
+
+    def sweep_stale(self) -> Tuple[int, int]:
+        """Delete checkpoint files and emptied export directories older than the TTL, at most once per tenth of it.
+
+        Returns the numbers of files and directories removed.
+        """
+        now = time.time()
+        with self._sweep_lock:
+            if self.ttl_seconds <= 0 or now - self._last_sweep < self.ttl_seconds / 10:
+                return 0, 0
+            self._last_sweep = now
+
+        cutoff = now - self.ttl_seconds
+        files = directories = 0
+        try:
+            export_dirs = list(os.scandir(self.checkpoint_dir))
+        except FileNotFoundError:
+            return 0, 0
+        for export_dir in export_dirs:
+            try:
+                if not export_dir.is_dir():
+                    continue
+                # Only directories untouched for the whole TTL are removed once emptied
+                stale_dir = export_dir.stat().st_mtime < cutoff
+                entries = list(os.scandir(export_dir.path))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        files += 1
+                except FileNotFoundError:
+                    pass
+            if stale_dir:
+                try:
+                    os.rmdir(export_dir.path)
+                    directories += 1
+                except OSError:
+                    # Removed concurrently, or holds files that are still fresh
+                    pass
+        return files, directories
+
+
+def create_export_downloader() -> Optional[ChunkedExportDownloader]:
+    """The downloader configured by settings, or None when chunking is disabled."""
+    if settings.MIXPANEL_CHUNK_DAYS <= 0:
+        return None
+    return ChunkedExportDownloader(
+        api_secret=settings.MIXPANEL_API_SECRET,
+        export_url=settings.MIXPANEL_EXPORT_URL,
+        checkpoint_dir=settings.MIXPANEL_CHECKPOINT_DIR,
+        chunk_days=settings.MIXPANEL_CHUNK_DAYS,
+        max_workers=settings.MIXPANEL_DOWNLOAD_WORKERS,
+        max_retries=settings.MIXPANEL_MAX_RETRIES,
+        backoff_seconds=settings.MIXPANEL_RETRY_BACKOFF_SECONDS,
+        timeout_seconds=settings.MIXPANEL_TIMEOUT_SECONDS,
+        ttl_seconds=settings.MIXPANEL_CHECKPOINT_TTL_HOURS * 3600,
+    )
@@ -0,0 +1,145 @@
+import heapq
+import math
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from src.event_batch import EVENT_TYPE_CODES, EVENT_TYPES, EventBatch, EventRecord, from_epoch_us
+from src.models import EventType, InterestKind, UserInterest, UserProfile
+
+
+class _ItemStats:
+    __slots__ = ("score", "interactions", "last_interaction")
+
+    def __init__(self):
+        self.score = 0.0
+        self.interactions = 0
+        self.last_interaction: Optional[datetime] = None
+
+
+class InterestAggregator:
+    """Running tag/tool scores fed one event at a time.
+
+    Only per-item totals are kept, so memory is bounded by the number of
+    distinct tags and tools no matter how many events are streamed through.
+    """
+
+    def __init__(
+        self,
+        event_weights: Dict[str, float],
+        time_decay_factor: float,
+        min_interactions: int,
+        max_top_items: int,
+        now: Optional[datetime] = None,
+    ):
+        self.event_weights = event_weights
+        self.time_decay_factor = time_decay_factor
+        self.min_interactions = min_interactions
+        self.max_top_items = max_top_items
+        self.now = now or datetime.now()
+        self.total_events = 0
+        self.tags: Dict[str, _ItemStats] = {}
+        self.tools: Dict[str, _ItemStats] = {}
+        self.completed: Set[str] = set()
+        self._decay_by_days: Dict[int, float] = {}
+
+    def _decay(self, event_time: datetime) -> float:
+        days_ago = int((self.now - event_time).days)
+        decay = self._decay_by_days.get(days_ago)
+        if decay is None:
+            decay = math.exp(-self.time_decay_factor * days_ago)
+            self._decay_by_days[days_ago] = decay
+        return decay
+
+    def add(self, event: EventRecord) -> None:
+        self._add(event.event_type, event.timestamp, event.tags, event.tools)
+        if event.event_type == EventType.COMPLETED:
+            self._complete(event.tutorial_id, event.timestamp)
+
+    def add_batch(self, batch: EventBatch) -> "InterestAggregator":
+        tag_offsets = batch.tag_offsets.tolist()
+        tool_offsets = batch.tool_offsets.tolist()
+        tag_codes = batch.tag_codes.tolist()
+        tool_codes = batch.tool_codes.tolist()
+        completed = EVENT_TYPE_CODES[EventType.COMPLETED]
+        for i, (tutorial_code, event_type, timestamp) in enumerate(
+            zip(batch.tutorial_codes.tolist(), batch.event_types.tolist(), batch.timestamps.tolist())
+        ):
+            event_time = from_epoch_us(timestamp)
+            self._add(
+                EVENT_TYPES[event_type],
+                event_time,
+                [batch.tag_names[code] for code in tag_codes[tag_offsets[i]:tag_offsets[i + 1]]],
+                [batch.tool_names[code] for code in tool_codes[tool_offsets[i]:tool_offsets[i + 1]]],
+            )
+            if event_type == completed:
+                self._complete(batch.tutorial_names[tutorial_code], event_time)
+        return self
+
+    def _add(self, event_type: str, timestamp: datetime, tags: Iterable[str], tools: Iterable[str]) -> None:
+        final_weight = self.event_weights.get(event_type, 1.0) * self._decay(timestamp)
+        self.total_events += 1
+
+        for tag in tags:
+            stats = self.tags.get(tag)
+            if stats is None:
+                stats = self.tags[tag] = _ItemStats()
+            stats.score += final_weight
+            stats.interactions += 1
+            stats.last_interaction = timestamp
+
+        for tool in tools:
+            stats = self.tools.get(tool)
+            if stats is None:
+                stats = self.tools[tool] = _ItemStats()
+            stats.score += final_weight
+            stats.interactions += 1
+            stats.last_interaction = timestamp
+
+    def _complete(self, tutorial_id: str, timestamp: datetime) -> None:
+        self.completed.add(tutorial_id)
+
+    def add_events(self, events: Iterable[EventRecord]) -> "InterestAggregator":
+        for event in events:
+            self.add(event)
+        return self
+
+    def _interests(self, items: Dict[str, _ItemStats], kind: InterestKind) -> List[UserInterest]:
+        return [
+            UserInterest(
+                tag_or_tool=name,
+                score=stats.score,
+                interaction_count=stats.interactions,
+                last_interaction=stats.last_interaction,
+                kind=kind
+            )
+            for name, stats in items.items()
+            if stats.interactions >= self.min_interactions
+        ]
+
+    def _top_names(self, interests: List[UserInterest]) -> List[str]:
+        # nlargest keeps the order of equal scores, like a stable sort, in O(n log k)
+        return [
+            interest.tag_or_tool
+            for interest in heapq.nlargest(self.max_top_items, interests, key=lambda x: x.score)
+        ]
+
+    def build_profile(self, user_id: str) -> UserProfile:
+        tag_interests = self._interests(self.tags, InterestKind.TAG)
+        tool_interests = self._interests(self.tools, InterestKind.TOOL)
+
+        top_tags = self._top_names(tag_interests)
+        top_tools = self._top_names(tool_interests)
+
+        interests = tag_interests + tool_interests
+        interests.sort(key=lambda x: x.score, reverse=True)
+
+        return UserProfile(
+            user_id=user_id,
+            email="",
+            name="",
+            total_events=self.total_events,
+            interests=interests,
+            top_tags=top_tags,
+            top_tools=top_tools,
+            completed_tutorials=sorted(self.completed),
+        )
@@ -0,0 +1,211 @@
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from scipy import sparse
+
+from src.models import InterestKind, UserProfile
+from src.vectorized_engine import top_k_positions
+
+
+class Vocabulary:
+    """Global name <-> integer ID mapping; IDs are assigned once and never reused."""
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._ids: Dict[str, int] = {}
+        self.names: List[str] = []
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._ids
+
+    def get(self, name: str) -> Optional[int]:
+        return self._ids.get(name)
+
+    def add(self, name: str) -> int:
+        item_id = self._ids.get(name)
+        if item_id is None:
+            item_id = self._ids[name] = len(self.names)
+            self.names.append(name)
+        return item_id
+
+
+# Rows rewritten since the CSC snapshot was built, as a share of all users,
+# before a top_users read rebuilds the snapshot instead of patching it
+MAX_DIRTY_FRACTION = 0.05
+MIN_DIRTY_ROWS = 256
+
+
+class InterestMatrix:
+    """Every scored user's tag and tool scores as sparse user x item matrices.
+
+    Rows are indexed by a user vocabulary and columns by one global
+    vocabulary per InterestKind. Writes replace a whole row. The top users
+    for an item are a column read of a CSC snapshot, patched with the rows
+    written since it was built; the snapshot is only rebuilt once those
+    rows pass MAX_DIRTY_FRACTION of the users, so a steady stream of newly
+    scored users costs one rebuild per few thousand writes, not per read.
+    """
+
+    def __init__(self):
+        self.users = Vocabulary()
+        self.vocabularies: Dict[InterestKind, Vocabulary] = {kind: Vocabulary() for kind in InterestKind}
+        self._rows: Dict[InterestKind, Dict[int, Tuple[np.ndarray, np.ndarray]]] = {kind: {} for kind in InterestKind}
+        self._csr: Dict[InterestKind, "sparse.csr_matrix"] = {}
+        self._csc: Dict[InterestKind, "sparse.csc_matrix"] = {}
+        # Rows written since the CSC snapshot, and their current scores by column
+        self._dirty: Dict[InterestKind, Set[int]] = {kind: set() for kind in InterestKind}
+        self._patches: Dict[InterestKind, Dict[int, Dict[int, float]]] = {kind: {} for kind in InterestKind}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(set().union(*(rows.keys() for rows in self._rows.values())))
+
+    def set_profile(self, profile: UserProfile) -> None:
+        """Replace the user's row with the scores of a freshly computed profile."""
+        items: Dict[InterestKind, Dict[int, float]] = {kind: {} for kind in InterestKind}
+        with self._lock:
+            row = self.users.add(profile.user_id)
+            for interest in profile.interests:
+                if interest.kind is None:
+                    continue
+                items[interest.kind][self.vocabularies[interest.kind].add(interest.tag_or_tool)] = interest.score
+            for kind, scores in items.items():
+                self._set_row(kind, row, scores)
+
+    def _set_row(self, kind: InterestKind, row: int, scores: Dict[int, float]) -> None:
+        if kind in self._csc:
+            patches = self._patches[kind]
+            if row in self._dirty[kind] and row in self._rows[kind]:
+                for column in self._rows[kind][row][0].tolist():
+                    patches[column].pop(row, None)
+            for column, score in scores.items():
+                patches.setdefault(column, {})[row] = score
+            self._dirty[kind].add(row)
+        if scores:
+            self._rows[kind][row] = (
+                np.fromiter(scores.keys(), dtype=np.int32, count=len(scores)),
+                np.fromiter(scores.values(), dtype=np.float64, count=len(scores)),
+            )
+        else:
+            self._rows[kind].pop(row, None)
+        self._csr.pop(kind, None)
+
+    def remove_user(self, user_id: str) -> None:
+        with self._lock:
+            row = self.users.get(user_id)
+            if row is None:
+                return
+            for kind in InterestKind:
+                self._set_row(kind, row, {})
+
+    def _matrix(self, kind: InterestKind) -> "sparse.csr_matrix":
+        matrix = self._csr.get(kind)
+        if matrix is None:
+            # scipy is only needed once a matrix is read, not to record profiles
+            from scipy import sparse
+            rows = self._rows[kind]
+            lengths = np.zeros(len(self.users), dtype=np.int64)
+            for row, (indices, _) in rows.items():
+                lengths[row] = len(indices)
+            indptr = np.concatenate([[0], np.cumsum(lengths)])
+            ordered = [rows[row] for row in sorted(rows)]
+            indices = np.concatenate([item[0] for item in ordered]) if ordered else np.empty(0, dtype=np.int32)
+            data = np.concatenate([item[1] for item in ordered]) if ordered else np.empty(0, dtype=np.float64)
+            matrix = self._csr[kind] = sparse.csr_matrix(
+                (data, indices, indptr), shape=(len(self.users), len(self.vocabularies[kind]))
+            )
+        return matrix
+
+    def _column(self, kind: InterestKind, column: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and scores of one item column, current as of the latest writes."""
+        dirty = self._dirty[kind]
+        matrix = self._csc.get(kind)
+        if matrix is None or len(dirty) > max(MIN_DIRTY_ROWS, MAX_DIRTY_FRACTION * len(self.users)):
+            matrix = self._csc[kind] = self._matrix(kind).tocsc()
+            dirty.clear()
+            self._patches[kind] = {}
+
+        if column < matrix.shape[1]:
+            start, end = matrix.indptr[column], matrix.indptr[column + 1]
+            rows, data = matrix.indices[start:end], matrix.data[start:end]
+        else:
+            # Item first seen after the snapshot was built
+            rows, data = np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+        if not dirty:
+            return rows, data
+
+        # Rows written since the snapshot: drop their stale entries, add their current scores
+        keep = ~np.isin(rows, np.fromiter(dirty, dtype=np.int64, count=len(dirty)))
+        patch = self._patches[kind].get(column, {})
+        return (
+            np.concatenate([rows[keep], np.fromiter(patch.keys(), dtype=rows.dtype, count=len(patch))]),
+            np.concatenate([data[keep], np.fromiter(patch.values(), dtype=np.float64, count=len(patch))]),
+        )
+
+    def top_users(self, kind: InterestKind, name: str, k: int) -> List[Tuple[str, float]]:
+        """The k users with the highest score for one tag or tool, best first."""
+        with self._lock:
+            column = self.vocabularies[kind].get(name)
+            if column is None:
+                return []
+            rows, data = self._column(kind, column)
+            users = self.users.names
+        return [(users[rows[i]], float(data[i])) for i in top_k_positions(data, k)]
+
+    def iter_scores(self) -> Iterator[Tuple[InterestKind, str, str, float]]:
+        """Every stored (kind, item, user_id, score)."""
+        with self._lock:
+            rows = {kind: dict(self._rows[kind]) for kind in InterestKind}
+            users = list(self.users.names)
+            names = {kind: list(self.vocabularies[kind].names) for kind in InterestKind}
+        for kind in InterestKind:
+            for row, (indices, data) in rows[kind].items():
+                for column, score in zip(indices.tolist(), data.tolist()):
+                    yield kind, names[kind][column], users[row], score
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            arrays = {"users": np.array(self.users.names, dtype=str)}
+            for kind in InterestKind:
+                matrix = self._matrix(kind)
+                arrays[f"{kind.value}_names"] = np.array(self.vocabularies[kind].names, dtype=str)
+                arrays[f"{kind.value}_indptr"] = matrix.indptr
+                arrays[f"{kind.value}_indices"] = matrix.indices
+                arrays[f"{kind.value}_data"] = matrix.data
+        # np.savez appends .npz unless the name already ends with it
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "InterestMatrix":
+        interest_matrix = cls()
+        with np.load(path) as arrays:
+            interest_matrix.users = Vocabulary(arrays["users"].tolist())
+            for kind in InterestKind:
+                interest_matrix.vocabularies[kind] = Vocabulary(arrays[f"{kind.value}_names"].tolist())
+                indptr = arrays[f"{kind.value}_indptr"]
+                indices = arrays[f"{kind.value}_indices"]
+                data = arrays[f"{kind.value}_data"]
+                for row in np.flatnonzero(np.diff(indptr)).tolist():
+                    start, end = indptr[row], indptr[row + 1]
+                    interest_matrix._rows[kind][row] = (indices[start:end].copy(), data[start:end].copy())
+        return interest_matrix
+
+
+def load_interest_matrix(path: str) -> InterestMatrix:
+    """The matrix saved at path, or an empty one if nothing has been materialized yet."""
+    if os.path.exists(path):
+        return InterestMatrix.load(path)
+    return InterestMatrix()
@@ -1,20 +1,60 @@
-from fastapi import FastAPI, HTTPException, Path
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, Path, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict
-import uvicorn
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import List, Dict, Optional
+import asyncio
 import os
-import sys
+import threading
+import time
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from src.analysis_engine import UserBehaviorAnalysisEngine
-from src.models import InterestResponse
+from src.metrics import (
+    HTTP_REQUEST_SECONDS,
+    HTTP_REQUESTS,
+    REGISTRY,
+    server_timing_header,
+    start_request_timings,
+)
+from src.models import BatchInterestRequest, CohortAnalytics, InterestKind, InterestResponse, RecommendationResponse
 from config.settings import settings
 
+_analysis_engine = None
+_analysis_engine_lock = threading.Lock()
+
+def create_analysis_engine():
+    """Build the process-wide engine on first use.
+
+    The engine and its numeric stack are imported here rather than at
+    module level, so the app accepts requests that don't need them
+    (/health, /metrics) as soon as the process starts.
+    """
+    global _analysis_engine
+    with _analysis_engine_lock:
+        if _analysis_engine is None:
+            from src.analysis_engine import UserBehaviorAnalysisEngine
+            engine = UserBehaviorAnalysisEngine()
+            REGISTRY.register_collector(engine.result_cache.metrics)
+            REGISTRY.register_collector(engine.profile_flights.metrics)
+            _analysis_engine = engine
+    return _analysis_engine
+
+async def get_analysis_engine():
+    """Endpoint dependency; the first call builds the engine off the event loop."""
+    if _analysis_engine is not None:
+        return _analysis_engine
+    return await asyncio.to_thread(create_analysis_engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    if _analysis_engine is not None:
+        await _analysis_engine.aclose()
+
 app = FastAPI(
     title=settings.API_TITLE,
     description="API for analyzing user behavior based on Mixpanel data",
-    version=settings.API_VERSION
+    version=settings.API_VERSION,
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -25,7 +65,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-analysis_engine = UserBehaviorAnalysisEngine()
+@app.middleware("http")
+async def record_timings(request: Request, call_next):
+    timings = start_request_timings()
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+
+    route = request.scope.get("route")
+    route_path = route.path if route is not None else "unmatched"
+    HTTP_REQUESTS.inc(method=request.method, route=route_path, status=response.status_code)
+    HTTP_REQUEST_SECONDS.observe(elapsed, method=request.method, route=route_path)
+    response.headers["Server-Timing"] = server_timing_header(timings, elapsed)
+    return response
 
 @app.get("/")
 async def root():
@@ -34,8 +86,15 @@ async def root():
         "version": settings.API_VERSION,
         "endpoints": {
             "interests": "/interests/{user_id}",
+            "batch_interests": "/interests/batch",
+            "tag_top_users": "/tags/{tag}/top-users",
+            "tool_top_users": "/tools/{tool}/top-users",
+            "recommendations": "/recommendations/{user_id}",
+            "analytics_summary": "/analytics/summary",
+            "analytics_cohort": "/analytics/cohort",
             "users": "/users",
-            "health": "/health"
+            "health": "/health",
+            "metrics": "/metrics"
         }
     }
 
@@ -43,20 +102,49 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "user-behavior-analysis"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/users")
-async def get_all_users():
+async def get_all_users(
+    offset: int = Query(0, ge=0, description="Index of the first user to return"),
+    limit: int = Query(settings.USERS_PAGE_SIZE, ge=1, le=settings.USERS_MAX_PAGE_SIZE, description="Page size"),
+    analysis_engine=Depends(get_analysis_engine)
+):
     try:
-        users_summary = analysis_engine.get_all_users_summary(settings.CSV_FILE_PATH)
-        return {
-            "users": users_summary,
-            "total_users": len(users_summary)
-        }
+        # Loading a changed users.csv is slow; keep it off the event loop
+        return await asyncio.to_thread(analysis_engine.get_users_page, settings.CSV_FILE_PATH, offset, limit)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting users list: {str(e)}")
 
+@app.post("/interests/batch")
+async def get_batch_user_interests(
+    request: BatchInterestRequest,
+    analysis_engine=Depends(get_analysis_engine)
+):
+    """Stream interests for many users as NDJSON, one line per user in completion order."""
+    if len(request.user_ids) > settings.BATCH_MAX_USERS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.BATCH_MAX_USERS} user IDs per batch"
+        )
+    if not os.path.exists(settings.CSV_FILE_PATH):
+        raise HTTPException(
+            status_code=404, 
+            detail=f"Data file {settings.CSV_FILE_PATH} not found"
+        )
+
+    async def ndjson_lines():
+        async for line in analysis_engine.aiter_batch_interests(request.user_ids, settings.CSV_FILE_PATH):
+            yield line + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
 @app.get("/interests/{user_id}", response_model=InterestResponse)
 async def get_user_interests(
-    user_id: str = Path(..., description="Unique user identifier")
+    user_id: str = Path(..., description="Unique user identifier"),
+    analysis_engine=Depends(get_analysis_engine)
 ):
     try:
         if not os.path.exists(settings.CSV_FILE_PATH):
@@ -65,7 +153,7 @@ async def get_user_interests(
                 detail=f"Data file {settings.CSV_FILE_PATH} not found"
             )
         
-        interests = analysis_engine.get_user_interests(user_id, settings.CSV_FILE_PATH)
+        interests = await analysis_engine.aget_user_interests(user_id, settings.CSV_FILE_PATH)
         return interests
         
     except ValueError as e:
@@ -75,7 +163,8 @@ async def get_user_interests(
 
 @app.get("/interests/{user_id}/detailed")
 async def get_detailed_user_interests(
-    user_id: str = Path(..., description="Unique user identifier")
+    user_id: str = Path(..., description="Unique user identifier"),
+    analysis_engine=Depends(get_analysis_engine)
 ):
     try:
         if not os.path.exists(settings.CSV_FILE_PATH):
@@ -84,23 +173,15 @@ async def get_detailed_user_interests(
                 detail=f"Data file {settings.CSV_FILE_PATH} not found"
             )
         
-        df = analysis_engine.load_user_data(settings.CSV_FILE_PATH)
-        
-        user_data = df[df['Distinct ID'] == user_id]
-        if user_data.empty:
-            raise HTTPException(status_code=404, detail=f"User with ID {user_id} not found")
-        
-        user_row = user_data.iloc[0]
-        total_events = int(user_row['Total Events of Tutorial viewed or Tutorial is saved or 4 others'])
+        user = await asyncio.to_thread(analysis_engine.get_user, user_id, settings.CSV_FILE_PATH)
         
-        events = analysis_engine.get_events_for_user(user_id)
-        user_profile = analysis_engine.analyze_user_interests(user_id, events)
+        user_profile = await analysis_engine.aget_user_profile(user_id)
         
         return {
             "user_id": user_id,
-            "email": user_row['Email'],
-            "name": user_row['Name'],
-            "total_events": total_events,
+            "email": user["email"],
+            "name": user["name"],
+            "total_events": user["total_events"],
             "all_interests": [
                 {
                     "item": interest.tag_or_tool,
@@ -120,8 +201,61 @@ async def get_detailed_user_interests(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"User analysis error: {str(e)}")
 
+@app.delete("/interests/{user_id}/cache")
+async def invalidate_user_interests(
+    user_id: str = Path(..., description="Unique user identifier"),
+    analysis_engine=Depends(get_analysis_engine)
+):
+    removed = analysis_engine.invalidate_user(user_id)
+    return {"user_id": user_id, "invalidated_entries": removed}
+
+@app.get("/cache/stats")
+async def get_cache_stats(analysis_engine=Depends(get_analysis_engine)):
+    return analysis_engine.result_cache.stats()
+
+@app.get("/tags/{tag}/top-users")
+async def get_top_users_for_tag(
+    tag: str = Path(..., description="Tag name"),
+    limit: int = Query(settings.MAX_TOP_ITEMS, ge=1, le=settings.USERS_MAX_PAGE_SIZE, description="Number of users"),
+    analysis_engine=Depends(get_analysis_engine)
+):
+    return {"tag": tag, "users": analysis_engine.get_top_users_for_item(InterestKind.TAG, tag, limit)}
+
+@app.get("/tools/{tool}/top-users")
+async def get_top_users_for_tool(
+    tool: str = Path(..., description="Tool name"),
+    limit: int = Query(settings.MAX_TOP_ITEMS, ge=1, le=settings.USERS_MAX_PAGE_SIZE, description="Number of users"),
+    analysis_engine=Depends(get_analysis_engine)
+):
+    return {"tool": tool, "users": analysis_engine.get_top_users_for_item(InterestKind.TOOL, tool, limit)}
+
+@app.get("/recommendations/{user_id}", response_model=RecommendationResponse)
+async def get_recommendations(
+    user_id: str = Path(..., description="Unique user identifier"),
+    limit: int = Query(settings.RECOMMENDATIONS_LIMIT, ge=1, le=settings.RECOMMENDATIONS_MAX_LIMIT, description="Number of tutorials"),
+    analysis_engine=Depends(get_analysis_engine)
+):
+    try:
+        for path in (settings.CSV_FILE_PATH, settings.TUTORIALS_CSV_PATH):
+            if not os.path.exists(path):
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Data file {path} not found"
+                )
+        
+        return await analysis_engine.aget_recommendations(
+            user_id, settings.CSV_FILE_PATH, settings.TUTORIALS_CSV_PATH, limit
+        )
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Recommendation error: {str(e)}")
+
 @app.get("/analytics/summary")
-async def get_analytics_summary():
+async def get_analytics_summary(analysis_engine=Depends(get_analysis_engine)):
     try:
         if not os.path.exists(settings.CSV_FILE_PATH):
             raise HTTPException(
@@ -129,30 +263,70 @@ async def get_analytics_summary():
                 detail=f"Data file {settings.CSV_FILE_PATH} not found"
             )
         
-        users_summary = analysis_engine.get_all_users_summary(settings.CSV_FILE_PATH)
+        summary = await asyncio.to_thread(analysis_engine.get_analytics_summary, settings.CSV_FILE_PATH, 5)
+        summary["analysis_timestamp"] = analysis_engine.clock()
+        return summary
         
-        total_users = len(users_summary)
-        total_events = sum(int(user['total_events']) for user in users_summary)
-        avg_events = total_events / total_users if total_users > 0 else 0
-        
-        most_active_users = sorted(users_summary, key=lambda x: x['total_events'], reverse=True)[:5]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting analytics: {str(e)}")
+
+@app.get("/analytics/cohort", response_model=CohortAnalytics)
+async def get_cohort_analytics(
+    active_days: Optional[int] = Query(None, ge=1, description="Only users with an event in the last N days"),
+    min_events: Optional[int] = Query(None, ge=0, description="Only users with at least this many total events"),
+    max_events: Optional[int] = Query(None, ge=0, description="Only users with at most this many total events"),
+    trend_days: int = Query(settings.COHORT_TREND_DAYS, ge=1, description="Length of the trend comparison windows"),
+    top_n: int = Query(settings.MAX_TOP_ITEMS, ge=1, le=settings.USERS_MAX_PAGE_SIZE, description="Tags and tools to return"),
+    analysis_engine=Depends(get_analysis_engine)
+):
+    try:
+        if not os.path.exists(settings.CSV_FILE_PATH):
+            raise HTTPException(
+                status_code=404,
+                detail=f"Data file {settings.CSV_FILE_PATH} not found"
+            )
         
-        return {
-            "total_users": total_users,
-            "total_events": total_events,
-            "average_events_per_user": round(avg_events, 2),
-            "most_active_users": most_active_users,
-            "analysis_timestamp": "2024-01-01T00:00:00"
-        }
+        return await analysis_engine.aget_cohort_analytics(
+            settings.CSV_FILE_PATH,
+            active_within_days=active_days,
+            min_total_events=min_events,
+            max_total_events=max_events,
+            trend_days=trend_days,
+            top_n=top_n,
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting analytics: {str(e)}")
 
-if __name__ == "__main__":
+def prepare_workers() -> None:
+    """Set up state shared by worker processes before uvicorn starts them.
+
+    Workers re-import settings from the environment. Pointing them at one
+    memory-mapped users directory means the OS page cache holds a single
+    copy, instead of every worker parsing the CSV into its own frame. This
+    process keeps the directory in step with the CSV while the workers run.
+    """
+    if settings.USERS_COLUMNAR_DIR or not os.path.exists(settings.CSV_FILE_PATH):
+        return
+    from src.columnar_users import build_columnar_users, columnar_users_stale, watch_users_csv
+    columnar_dir = os.path.join(os.path.dirname(settings.CSV_FILE_PATH), "users_columnar")
+    if columnar_users_stale(settings.CSV_FILE_PATH, columnar_dir):
+        build_columnar_users(settings.CSV_FILE_PATH, columnar_dir)
+    watch_users_csv(settings.CSV_FILE_PATH, columnar_dir, settings.USERS_RELOAD_INTERVAL_SECONDS)
+    os.environ["USERS_COLUMNAR_DIR"] = columnar_dir
+
+def serve() -> None:
+    import uvicorn
+    workers = max(1, settings.API_WORKERS)
+    if workers > 1:
+        prepare_workers()
     uvicorn.run(
         "src.main:app",
         host=settings.API_HOST,
         port=settings.API_PORT,
-        reload=True,
+        workers=workers,
+        reload=settings.API_RELOAD and workers == 1,
         log_level="info"
     )
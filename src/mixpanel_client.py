@@ -1,11 +1,16 @@
 import os
 import json
+import time
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Union
 
-import requests
+from src.event_batch import EventBatch, EventBatchBuilder, EventRecord, to_epoch_us
+from src.export_download import ChunkedExportDownloader
+from src.metrics import MIXPANEL_EXPORTS, record_stage
+from src.models import EventType
 
-from src.models import UserEvent, EventType
+
+DEFAULT_EXPORT_URL = "https://data.mixpanel.com/api/2.0/export/"
 
 
 def _to_datetime(value: object) -> datetime:
@@ -35,13 +40,112 @@ def _map_event_name_to_type(event_name: str) -> EventType:
     return EventType.VIEWED
 
 
-def fetch_user_events(
+def _parse_export_record(line: Union[bytes, str], user_id: Optional[str] = None) -> Optional[EventRecord]:
+    """Parse one NDJSON export line; without user_id the event keeps its own distinct_id."""
+    if not line:
+        return None
+    try:
+        payload = json.loads(line.decode("utf-8") if isinstance(line, bytes) else line)
+    except Exception:
+        return None
+
+    properties: Dict = payload.get("properties", {}) or {}
+    if user_id is None:
+        user_id = properties.get("distinct_id")
+        if not user_id:
+            return None
+        user_id = str(user_id)
+    elif properties.get("distinct_id") != user_id:
+        # Extra guard if filter is ignored
+        return None
+
+    event_name: str = payload.get("event", "")
+    event_type = _map_event_name_to_type(event_name)
+
+    tutorial_id = str(properties.get("tutorial_id") or properties.get("content_id") or "unknown")
+    tags = properties.get("tags") or []
+    tools = properties.get("tools") or []
+
+    timestamp = _to_datetime(properties.get("time") or properties.get("$time") or properties.get("mp_processing_time_ms"))
+
+    return EventRecord(
+        user_id=user_id,
+        tutorial_id=tutorial_id,
+        event_type=event_type,
+        timestamp=timestamp,
+        tags=[tag for tag in tags if isinstance(tag, str)] if isinstance(tags, list) else [],
+        tools=[tool for tool in tools if isinstance(tool, str)] if isinstance(tools, list) else [],
+    )
+
+
+def _append_record(builder: EventBatchBuilder, record: EventRecord) -> None:
+    builder.append(record.tutorial_id, record.event_type, to_epoch_us(record.timestamp), record.tags, record.tools)
+
+
+def _iter_export_lines(
+    params: Dict[str, str],
+    api_secret: str,
+    export_url: str,
+    downloader: Optional[ChunkedExportDownloader] = None,
+) -> Iterator[bytes]:
+    """NDJSON lines of an export: one streamed request, or the downloader's checkpointed chunks."""
+    if downloader is not None:
+        yield from downloader.iter_lines(params)
+        return
+
+    import requests
+
+    with requests.get(export_url, params=params, auth=(api_secret, ""), timeout=60, stream=True) as response:
+        response.raise_for_status()
+        yield from response.iter_lines()
+
+
+def _iter_timed_records(lines: Iterator[bytes], user_id: Optional[str] = None) -> Iterator[EventRecord]:
+    """Parse export lines, recording the export's network and parse time once it ends.
+
+    Time the caller spends between records counts towards neither stage.
+    """
+    lines = iter(lines)
+    network_seconds = 0.0
+    parse_seconds = 0.0
+    try:
+        while True:
+            started = time.perf_counter()
+            line = next(lines, None)
+            parse_started = time.perf_counter()
+            network_seconds += parse_started - started
+            if line is None:
+                break
+            record = _parse_export_record(line, user_id)
+            parse_seconds += time.perf_counter() - parse_started
+            if record is not None:
+                yield record
+    except Exception:
+        MIXPANEL_EXPORTS.inc(outcome="error")
+        raise
+    else:
+        MIXPANEL_EXPORTS.inc(outcome="ok")
+    finally:
+        record_stage("mixpanel_network", network_seconds)
+        record_stage("mixpanel_parse", parse_seconds)
+
+
+def iter_user_events(
     user_id: str,
     from_date: str,
     to_date: str,
     event_names: List[str],
     api_secret: str,
-) -> List[UserEvent]:
+    export_url: str = DEFAULT_EXPORT_URL,
+    downloader: Optional[ChunkedExportDownloader] = None,
+) -> Iterator[EventRecord]:
+    """Stream a user's export, yielding events as lines arrive.
+
+    The response body is never held in memory as a whole, so callers that
+    aggregate on the fly keep memory independent of the export size. With
+    a downloader, lines are read back from its chunk files once every
+    chunk has arrived.
+    """
     params: Dict[str, str] = {
         "from_date": from_date,
         "to_date": to_date,
@@ -49,44 +153,57 @@ def fetch_user_events(
         "where": json.dumps({"properties[\"distinct_id\"]": user_id}),
     }
 
-    url = "https://data.mixpanel.com/api/2.0/export/"
-    response = requests.get(url, params=params, auth=(api_secret, ""), timeout=60)
-    response.raise_for_status()
+    yield from _iter_timed_records(_iter_export_lines(params, api_secret, export_url, downloader), user_id)
 
-    events: List[UserEvent] = []
-    for line in response.iter_lines():
-        if not line:
-            continue
-        try:
-            payload = json.loads(line.decode("utf-8"))
-        except Exception:
-            continue
 
-        properties: Dict = payload.get("properties", {}) or {}
-        if properties.get("distinct_id") != user_id:
-            # Extra guard if filter is ignored
-            continue
-
-        event_name: str = payload.get("event", "")
-        event_type = _map_event_name_to_type(event_name)
+def iter_export_events(
+    from_date: str,
+    to_date: str,
+    event_names: List[str],
+    api_secret: str,
+    export_url: str = DEFAULT_EXPORT_URL,
+    downloader: Optional[ChunkedExportDownloader] = None,
+) -> Iterator[EventRecord]:
+    """Stream one unfiltered export covering every user in the date range."""
+    params: Dict[str, str] = {
+        "from_date": from_date,
+        "to_date": to_date,
+        "event": json.dumps(event_names),
+    }
 
-        tutorial_id = str(properties.get("tutorial_id") or properties.get("content_id") or "unknown")
-        tags = properties.get("tags") or []
-        tools = properties.get("tools") or []
+    yield from _iter_timed_records(_iter_export_lines(params, api_secret, export_url, downloader))
 
-        timestamp = _to_datetime(properties.get("time") or properties.get("$time") or properties.get("mp_processing_time_ms"))
 
-        events.append(
-            UserEvent(
-                user_id=user_id,
-                tutorial_id=tutorial_id,
-                event_type=event_type,
-                timestamp=timestamp,
-                tags=list(tags) if isinstance(tags, list) else [],
-                tools=list(tools) if isinstance(tools, list) else [],
-            )
-        )
+def fetch_user_event_batch(
+    user_id: str,
+    from_date: str,
+    to_date: str,
+    event_names: List[str],
+    api_secret: str,
+    export_url: str = DEFAULT_EXPORT_URL,
+    downloader: Optional[ChunkedExportDownloader] = None,
+) -> EventBatch:
+    """Fetch a user's export straight into an EventBatch, skipping per-event Pydantic models."""
+    params: Dict[str, str] = {
+        "from_date": from_date,
+        "to_date": to_date,
+        "event": json.dumps(event_names),
+        "where": json.dumps({"properties[\"distinct_id\"]": user_id}),
+    }
 
-    return events
+    builder = EventBatchBuilder(user_id)
+    for record in _iter_timed_records(_iter_export_lines(params, api_secret, export_url, downloader), user_id):
+        _append_record(builder, record)
+    return builder.build()
 
 
+def fetch_user_events(
+    user_id: str,
+    from_date: str,
+    to_date: str,
+    event_names: List[str],
+    api_secret: str,
+    export_url: str = DEFAULT_EXPORT_URL,
+    downloader: Optional[ChunkedExportDownloader] = None,
+) -> List[EventRecord]:
+    return list(iter_user_events(user_id, from_date, to_date, event_names, api_secret, export_url, downloader))
@@ -10,6 +10,10 @@ class EventType(str, Enum):
     STARTED = "tutorial_started"
     LIKED = "tutorial_liked"
 
+class InterestKind(str, Enum):
+    TAG = "tag"
+    TOOL = "tool"
+
 class UserEvent(BaseModel):
     user_id: str
     tutorial_id: str
@@ -31,6 +35,7 @@ class UserInterest(BaseModel):
     score: float
     interaction_count: int
     last_interaction: datetime
+    kind: Optional[InterestKind] = None
 
 class UserProfile(BaseModel):
     user_id: str
@@ -40,6 +45,8 @@ class UserProfile(BaseModel):
     interests: List[UserInterest]
     top_tags: List[str]
     top_tools: List[str]
+    # Tutorials completed within the scored window, for excluding them from recommendations
+    completed_tutorials: List[str] = []
 
 class InterestResponse(BaseModel):
     user_id: str
@@ -47,3 +54,36 @@ class InterestResponse(BaseModel):
     top_tools: List[Dict[str, float]]
     total_interactions: int
     analysis_timestamp: datetime
+
+class TutorialRecommendation(BaseModel):
+    tutorial: Tutorial
+    score: float
+
+class RecommendationResponse(BaseModel):
+    user_id: str
+    recommendations: List[TutorialRecommendation]
+    excluded_completed: int
+    analysis_timestamp: datetime
+
+class CohortItem(BaseModel):
+    name: str
+    score: float
+    share: float
+    users: int
+    user_share: float
+    recent_weight: float
+    previous_weight: float
+    trend: Optional[float] = None
+
+class CohortAnalytics(BaseModel):
+    total_users: int
+    matched_users: int
+    total_events: int
+    segment: Dict[str, Optional[int]]
+    trend_days: int
+    top_tags: List[CohortItem]
+    top_tools: List[CohortItem]
+    analysis_timestamp: datetime
+
+class BatchInterestRequest(BaseModel):
+    user_ids: List[str]
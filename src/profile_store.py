@@ -0,0 +1,79 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional
+
+from src.models import InterestResponse
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id TEXT PRIMARY KEY,
+    computed_at TEXT NOT NULL,
+    payload TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class ProfileStore:
+    """Precomputed interest responses keyed by user ID.
+
+    Filled offline by materialize_profiles.py and read on the request path
+    with a single primary-key lookup.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def put_many(self, responses: Iterable[InterestResponse]) -> int:
+        rows = [
+            (response.user_id, response.analysis_timestamp.isoformat(), response.model_dump_json())
+            for response in responses
+        ]
+        with self._connection() as conn:
+            conn.executemany("INSERT OR REPLACE INTO profiles VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def get(self, user_id: str) -> Optional[InterestResponse]:
+        row = self._connection().execute(
+            "SELECT payload FROM profiles WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return InterestResponse.model_validate_json(row[0])
+
+    def delete(self, user_id: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM profiles WHERE user_id = ?", (user_id,))
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+
+_stores: Dict[str, ProfileStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_profile_store(path: str) -> ProfileStore:
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(path)
+            if store is None:
+                store = _stores[path] = ProfileStore(path)
+    return store
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+
+class ResultCache:
+    """Bounded TTL cache with LRU eviction for computed per-user results.
+
+    Keys are ``(user_id, kind)`` pairs so every entry of a user can be
+    dropped at once with invalidate_user. A ttl_seconds of 0 disables caching.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, Any]]" = OrderedDict()
+        self._keys_by_user: Dict[str, Set[Tuple[str, Hashable]]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def _remove(self, key: Tuple[str, Hashable]) -> None:
+        self._entries.pop(key, None)
+        user_keys = self._keys_by_user.get(key[0])
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._keys_by_user[key[0]]
+
+    def get(self, user_id: str, kind: Hashable) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        key = (user_id, kind)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user_id: str, kind: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        key = (user_id, kind)
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: str) -> int:
+        with self._lock:
+            keys = list(self._keys_by_user.get(user_id, ()))
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def metrics(self) -> List[Tuple[str, str, str, float]]:
+        """Samples for MetricsRegistry.register_collector."""
+        stats = self.stats()
+        return [
+            ("result_cache_hits_total", "counter", "Result cache hits", stats["hits"]),
+            ("result_cache_misses_total", "counter", "Result cache misses", stats["misses"]),
+            ("result_cache_evictions_total", "counter", "Result cache evictions", stats["evictions"]),
+            ("result_cache_entries", "gauge", "Entries currently cached", stats["entries"]),
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,153 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    user_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (user_id, kind)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_expires_at ON results (expires_at);
+"""
+
+# Writes between size checks; COUNT(*) is a full scan in SQLite
+EVICTION_INTERVAL = 100
+
+
+class SharedResultCache:
+    """ResultCache counterpart stored in a local SQLite file shared by every worker process.
+
+    Values are Pydantic models serialized as JSON, one model class per
+    kind. A value written or invalidated by one worker is seen by all
+    others on their next read. Expiry uses wall-clock time because
+    monotonic clocks are per process. When the table grows past
+    max_entries, the entries closest to expiry are evicted first. Hit and
+    miss counters are per process.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: float,
+        max_entries: int,
+        models: Dict[str, Type[BaseModel]],
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.models = models
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes = 0
+        self._counter_lock = threading.Lock()
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, hit: bool) -> None:
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, user_id: str, kind: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        row = self._connection().execute(
+            "SELECT payload FROM results WHERE user_id = ? AND kind = ? AND expires_at > ?",
+            (user_id, kind, self.clock()),
+        ).fetchone()
+        self._count(row is not None)
+        if row is None:
+            return None
+        return self.models[kind].model_validate_json(row[0])
+
+    def set(self, user_id: str, kind: str, value: BaseModel) -> None:
+        if not self.enabled:
+            return
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (user_id, kind, self.clock() + self.ttl_seconds, value.model_dump_json()),
+            )
+        with self._counter_lock:
+            self._writes += 1
+            evict = self._writes % EVICTION_INTERVAL == 0
+        if evict:
+            self._evict()
+
+    def _evict(self) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM results WHERE expires_at <= ?", (self.clock(),))
+            excess = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM results WHERE (user_id, kind) IN "
+                    "(SELECT user_id, kind FROM results ORDER BY expires_at LIMIT ?)",
+                    (excess,),
+                )
+                with self._counter_lock:
+                    self.evictions += excess
+
+    def invalidate_user(self, user_id: str) -> int:
+        with self._connection() as conn:
+            return conn.execute("DELETE FROM results WHERE user_id = ?", (user_id,)).rowcount
+
+    def clear(self) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM results")
+
+    def metrics(self) -> List[Tuple[str, str, str, float]]:
+        """Samples for MetricsRegistry.register_collector."""
+        stats = self.stats()
+        return [
+            ("result_cache_hits_total", "counter", "Result cache hits", stats["hits"]),
+            ("result_cache_misses_total", "counter", "Result cache misses", stats["misses"]),
+            ("result_cache_evictions_total", "counter", "Result cache evictions", stats["evictions"]),
+            ("result_cache_entries", "gauge", "Entries currently cached", stats["entries"]),
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._connection().execute(
+            "SELECT COUNT(*) FROM results WHERE expires_at > ?", (self.clock(),)
+        ).fetchone()[0]
+        with self._counter_lock:
+            return {
+                "enabled": self.enabled,
+                "shared": True,
+                "path": self.path,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
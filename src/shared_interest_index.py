@@ -0,0 +1,98 @@
+import os
+import sqlite3
+import threading
+from typing import List, Tuple
+
+from src.interest_matrix import InterestMatrix
+from src.models import InterestKind, UserProfile
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interest_scores (
+    kind TEXT NOT NULL,
+    item TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (kind, item, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS interest_scores_rank ON interest_scores (kind, item, score DESC);
+CREATE INDEX IF NOT EXISTS interest_scores_user ON interest_scores (user_id);
+CREATE TABLE IF NOT EXISTS interest_scores_imports (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class SharedInterestIndex:
+    """InterestMatrix counterpart stored in a local SQLite file shared by every worker process.
+
+    Every scored user's tag/tool scores are rows of one table indexed by
+    (kind, item, score), so the top users for an item are an index range
+    scan and a profile scored by one worker is ranked by all of them. A
+    matrix saved by materialize_profiles.py is imported once per version.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(DISTINCT user_id) FROM interest_scores").fetchone()[0]
+
+    def import_matrix(self, matrix_path: str) -> bool:
+        """Load a saved InterestMatrix unless this version of the file was already imported."""
+        if not os.path.exists(matrix_path):
+            return False
+        mtime_ns = os.stat(matrix_path).st_mtime_ns
+        key = os.path.abspath(matrix_path)
+        conn = self._connection()
+        with conn:
+            # Workers start together; the write lock makes exactly one of them import
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT mtime_ns FROM interest_scores_imports WHERE path = ?", (key,)).fetchone()
+            if row is not None and row[0] == mtime_ns:
+                return False
+            conn.executemany(
+                "INSERT OR REPLACE INTO interest_scores VALUES (?, ?, ?, ?)",
+                ((kind.value, item, user_id, score)
+                 for kind, item, user_id, score in InterestMatrix.load(matrix_path).iter_scores()),
+            )
+            conn.execute("INSERT OR REPLACE INTO interest_scores_imports VALUES (?, ?)", (key, mtime_ns))
+        return True
+
+    def set_profile(self, profile: UserProfile) -> None:
+        """Replace the user's scores with those of a freshly computed profile."""
+        rows = [
+            (interest.kind.value, interest.tag_or_tool, profile.user_id, interest.score)
+            for interest in profile.interests
+            if interest.kind is not None
+        ]
+        with self._connection() as conn:
+            conn.execute("DELETE FROM interest_scores WHERE user_id = ?", (profile.user_id,))
+            conn.executemany("INSERT OR REPLACE INTO interest_scores VALUES (?, ?, ?, ?)", rows)
+
+    def remove_user(self, user_id: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM interest_scores WHERE user_id = ?", (user_id,))
+
+    def top_users(self, kind: InterestKind, name: str, k: int) -> List[Tuple[str, float]]:
+        """The k users with the highest score for one tag or tool, best first."""
+        return self._connection().execute(
+            "SELECT user_id, score FROM interest_scores WHERE kind = ? AND item = ? ORDER BY score DESC LIMIT ?",
+            (kind.value, name, k),
+        ).fetchall()
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while
+    it is in flight wait for it and receive the same result or exception.
+    Nothing is remembered once the call finishes, so the next caller
+    starts a new one. Threads (do) and coroutines (ado) are tracked
+    separately.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Tuple[int, Hashable], "asyncio.Task"] = {}
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        # Tasks belong to one event loop; key them by loop so loops never share
+        task_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            if task is None:
+                task = self._tasks[task_key] = asyncio.ensure_future(func())
+                task.add_done_callback(lambda _: self._forget(task_key))
+                self.calls += 1
+            else:
+                self.shared += 1
+        # A cancelled caller must not cancel the computation the others wait on
+        return await asyncio.shield(task)
+
+    def _forget(self, task_key: Tuple[int, Hashable]) -> None:
+        with self._lock:
+            self._tasks.pop(task_key, None)
+
+    def metrics(self) -> List[Tuple[str, str, str, float]]:
+        """Samples for MetricsRegistry.register_collector."""
+        with self._lock:
+            return [
+                ("single_flight_calls_total", "counter", "Computations started", self.calls),
+                ("single_flight_shared_total", "counter", "Callers served by an in-flight computation", self.shared),
+                ("single_flight_in_flight", "gauge", "Computations currently running", len(self._calls) + len(self._tasks)),
+            ]
@@ -0,0 +1,181 @@
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.interest_matrix import Vocabulary
+from src.metrics import stage
+from src.models import InterestKind, Tutorial, UserProfile
+from src.vectorized_engine import top_k_positions
+
+
+TUTORIAL_COLUMNS = ["id", "title", "tags", "tools", "difficulty_level", "category"]
+# Separator inside the tags/tools cells of tutorials.csv
+LIST_SEPARATOR = "|"
+
+
+def _split(cell: str) -> List[str]:
+    return [item for item in (part.strip() for part in cell.split(LIST_SEPARATOR)) if item]
+
+
+class TutorialCatalog:
+    """tutorials.csv as a tutorial x item matrix plus per-item inverted indexes.
+
+    Columns are one Vocabulary per InterestKind laid side by side (tags
+    first, then tools), so scoring every tutorial against a user is a
+    single sparse matrix-vector product. The CSC form of the same matrix
+    is the inverted index: column j lists the tutorials tagged with item j.
+    The file is re-read when its mtime or size changes.
+    """
+
+    def __init__(self, csv_file_path: str):
+        self.csv_file_path = csv_file_path
+        self._lock = threading.Lock()
+        self._version: Optional[Tuple[int, int]] = None
+        self._frame: Optional[pd.DataFrame] = None
+        self._positions: Dict[str, int] = {}
+        self._vocabularies: Dict[InterestKind, Vocabulary] = {}
+        self._offsets: Dict[InterestKind, int] = {}
+        self._matrix: Optional[sparse.csr_matrix] = None
+        self._index: Optional[sparse.csc_matrix] = None
+
+    def _file_version(self) -> Tuple[int, int]:
+        stat = os.stat(self.csv_file_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self, version: Tuple[int, int]) -> None:
+        try:
+            with stage("load_tutorial_catalog"):
+                df = pd.read_csv(self.csv_file_path, dtype=str, keep_default_na=False)
+                missing = [column for column in ("id", "title", "tags", "tools") if column not in df.columns]
+                if missing:
+                    raise ValueError(f"missing columns {missing}")
+                df = df.reindex(columns=TUTORIAL_COLUMNS, fill_value="")
+                self._build(df)
+        except Exception as e:
+            raise Exception(f"Error loading tutorial catalog: {e}")
+        self._version = version
+
+    def _build(self, df: pd.DataFrame) -> None:
+        vocabularies: Dict[InterestKind, Vocabulary] = {}
+        offsets: Dict[InterestKind, int] = {}
+        rows: List[np.ndarray] = []
+        columns: List[np.ndarray] = []
+        width = 0
+        for kind, column in ((InterestKind.TAG, "tags"), (InterestKind.TOOL, "tools")):
+            items = df[column].str.split(LIST_SEPARATOR).explode().str.strip()
+            # One entry per (tutorial, item), so every stored value is 1
+            pairs = pd.DataFrame({"row": items.index, "name": items.to_numpy()})
+            pairs = pairs[pairs["name"].fillna("") != ""].drop_duplicates()
+            codes, names = pd.factorize(pairs["name"])
+            vocabularies[kind] = Vocabulary(names.tolist())
+            offsets[kind] = width
+            width += len(names)
+            rows.append(pairs["row"].to_numpy(dtype=np.int64))
+            columns.append(codes.astype(np.int64) + offsets[kind])
+
+        row_ids = np.concatenate(rows)
+        matrix = sparse.csr_matrix(
+            (np.ones(len(row_ids), dtype=np.float64), (row_ids, np.concatenate(columns))), shape=(len(df), width)
+        )
+
+        positions: Dict[str, int] = {}
+        for position, tutorial_id in enumerate(df["id"].tolist()):
+            positions.setdefault(tutorial_id, position)
+
+        self._frame = df
+        self._positions = positions
+        self._vocabularies = vocabularies
+        self._offsets = offsets
+        self._matrix = matrix
+        self._index = matrix.tocsc()
+
+    def refresh(self) -> None:
+        version = self._file_version()
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self._load(version)
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._frame)
+
+    def _tutorial(self, position: int) -> Tutorial:
+        row = self._frame.iloc[position]
+        return Tutorial(
+            id=row["id"],
+            title=row["title"],
+            tags=_split(row["tags"]),
+            tools=_split(row["tools"]),
+            difficulty_level=row["difficulty_level"] or None,
+            category=row["category"] or None,
+        )
+
+    def get(self, tutorial_id: str) -> Optional[Tutorial]:
+        self.refresh()
+        position = self._positions.get(tutorial_id)
+        return None if position is None else self._tutorial(position)
+
+    def _column(self, kind: InterestKind, name: str) -> Optional[int]:
+        item = self._vocabularies[kind].get(name)
+        return None if item is None else self._offsets[kind] + item
+
+    def tutorial_ids_for(self, kind: InterestKind, name: str) -> List[str]:
+        """IDs of tutorials tagged with a tag or tool, in catalog order."""
+        self.refresh()
+        column = self._column(kind, name)
+        if column is None:
+            return []
+        index = self._index
+        positions = index.indices[index.indptr[column]:index.indptr[column + 1]]
+        return self._frame["id"].to_numpy()[np.sort(positions)].tolist()
+
+    def interest_vector(self, profile: UserProfile) -> np.ndarray:
+        """The profile's scores laid out on the catalog's item columns; items no tutorial has are dropped."""
+        vector = np.zeros(self._matrix.shape[1], dtype=np.float64)
+        for interest in profile.interests:
+            if interest.kind is None:
+                continue
+            column = self._column(interest.kind, interest.tag_or_tool)
+            if column is not None:
+                vector[column] = interest.score
+        return vector
+
+    def recommend(
+        self, profile: UserProfile, limit: int, exclude_ids: Iterable[str] = ()
+    ) -> List[Tuple[Tutorial, float]]:
+        """Best-matching tutorials for a profile, best first.
+
+        A tutorial's score is the sum of the user's scores for its tags and
+        tools. Tutorials matching none of the user's interests are never
+        returned; equal scores keep catalog order.
+        """
+        self.refresh()
+        scores = self._matrix @ self.interest_vector(profile)
+        excluded = [self._positions[tutorial_id] for tutorial_id in exclude_ids if tutorial_id in self._positions]
+        if excluded:
+            scores[excluded] = -np.inf
+        positions = top_k_positions(scores, limit)
+        return [
+            (self._tutorial(position), float(scores[position]))
+            for position in positions.tolist()
+            if scores[position] > 0
+        ]
+
+
+_catalogs: Dict[str, TutorialCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_tutorial_catalog(csv_file_path: str) -> TutorialCatalog:
+    """Return the process-wide catalog for a path, creating it on first use."""
+    catalog = _catalogs.get(csv_file_path)
+    if catalog is None:
+        with _catalogs_lock:
+            catalog = _catalogs.setdefault(csv_file_path, TutorialCatalog(csv_file_path))
+    return catalog
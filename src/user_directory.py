@@ -0,0 +1,172 @@
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+from src.metrics import stage
+
+
+USER_ID_COLUMN = "Distinct ID"
+EMAIL_COLUMN = "Email"
+NAME_COLUMN = "Name"
+TOTAL_EVENTS_COLUMN = "Total Events of Tutorial viewed or Tutorial is saved or 4 others"
+
+
+class _Snapshot(NamedTuple):
+    """One parsed version of the file; replaced whole, never mutated except for its summary cache."""
+
+    version: Tuple[int, int]
+    frame: "pd.DataFrame"
+    index: Dict[str, int]
+    summaries: Dict[int, Dict]
+
+
+class UserDirectory:
+    """In-memory users.csv index keyed by distinct ID.
+
+    The CSV is parsed once and re-read only when its mtime or size changes,
+    so lookups on the request path are a dict access instead of a full scan.
+    """
+
+    def __init__(self, csv_file_path: str):
+        self.csv_file_path = csv_file_path
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+
+    def _file_version(self) -> Tuple[int, int]:
+        stat = os.stat(self.csv_file_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self, version: Tuple[int, int]) -> None:
+        import pandas as pd
+
+        try:
+            with stage("load_user_data"):
+                df = pd.read_csv(self.csv_file_path)
+        except Exception as e:
+            raise Exception(f"Error loading data: {e}")
+
+        index: Dict[str, int] = {}
+        for position, user_id in enumerate(df[USER_ID_COLUMN].astype(str).tolist()):
+            # Keep the first row for duplicated IDs, same as the old mask + iloc[0]
+            index.setdefault(user_id, position)
+
+        # Readers take no lock, so frame and index must be published in one assignment
+        self._snapshot = _Snapshot(version, df, index, {})
+
+    def refresh(self) -> _Snapshot:
+        """Reload if the file changed and return the snapshot to read from."""
+        version = self._file_version()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != version:
+                self._load(version)
+            return self._snapshot
+
+    @property
+    def version(self) -> Optional[Tuple[int, int]]:
+        return self.refresh().version
+
+    @property
+    def frame(self) -> "pd.DataFrame":
+        return self.refresh().frame
+
+    def __len__(self) -> int:
+        return len(self.refresh().frame)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self.refresh().index
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        snapshot = self.refresh()
+        position = snapshot.index.get(user_id)
+        if position is None:
+            return None
+        return self._row(snapshot.frame, position)
+
+    @staticmethod
+    def _row(frame: "pd.DataFrame", position: int) -> Dict:
+        row = frame.iloc[position]
+        return {
+            "user_id": row[USER_ID_COLUMN],
+            "email": row[EMAIL_COLUMN],
+            "name": row[NAME_COLUMN],
+            "total_events": int(row[TOTAL_EVENTS_COLUMN]),
+        }
+
+    def get_many(self, user_ids: List[str]) -> Dict[str, Optional[Dict]]:
+        """Look up several IDs against a single snapshot of the file."""
+        snapshot = self.refresh()
+        users: Dict[str, Optional[Dict]] = {}
+        for user_id in user_ids:
+            position = snapshot.index.get(user_id)
+            users[user_id] = None if position is None else self._row(snapshot.frame, position)
+        return users
+
+    @staticmethod
+    def _records(df: "pd.DataFrame") -> List[Dict]:
+        import pandas as pd
+
+        records = pd.DataFrame({
+            "user_id": df[USER_ID_COLUMN],
+            "email": df[EMAIL_COLUMN],
+            "name": df[NAME_COLUMN],
+            "total_events": df[TOTAL_EVENTS_COLUMN].astype("int64"),
+        })
+        return records.to_dict("records")
+
+    def user_ids(self, min_total_events: Optional[int] = None, max_total_events: Optional[int] = None) -> List[str]:
+        """IDs of users whose event total is within the given bounds."""
+        df = self.refresh().frame
+        total_events = df[TOTAL_EVENTS_COLUMN].astype("int64")
+        mask = np.ones(len(total_events), dtype=bool)
+        if min_total_events is not None:
+            mask &= total_events.to_numpy() >= min_total_events
+        if max_total_events is not None:
+            mask &= total_events.to_numpy() <= max_total_events
+        return df.loc[mask, USER_ID_COLUMN].astype(str).tolist()
+
+    def all_users(self) -> List[Dict]:
+        return self._records(self.refresh().frame)
+
+    def page(self, offset: int, limit: int) -> List[Dict]:
+        return self._records(self.refresh().frame.iloc[offset:offset + limit])
+
+    def summary(self, top_n: int = 5) -> Dict:
+        """Totals and most active users, computed once per file version."""
+        snapshot = self.refresh()
+        summary = snapshot.summaries.get(top_n)
+        if summary is None:
+            df = snapshot.frame
+            total_events_column = df[TOTAL_EVENTS_COLUMN].astype("int64")
+            total_users = len(df)
+            total_events = int(total_events_column.sum())
+            # keep="first" preserves file order among ties, like the stable sort it replaces
+            most_active = df.loc[total_events_column.nlargest(top_n, keep="first").index]
+            summary = {
+                "total_users": total_users,
+                "total_events": total_events,
+                "average_events_per_user": round(total_events / total_users, 2) if total_users > 0 else 0,
+                "most_active_users": self._records(most_active),
+            }
+            snapshot.summaries[top_n] = summary
+        return summary
+
+
+_directories: Dict[str, UserDirectory] = {}
+_directories_lock = threading.Lock()
+
+
+def get_user_directory(csv_file_path: str) -> UserDirectory:
+    """Return the process-wide directory for a CSV path, creating it on first use."""
+    directory = _directories.get(csv_file_path)
+    if directory is None:
+        with _directories_lock:
+            directory = _directories.setdefault(csv_file_path, UserDirectory(csv_file_path))
+    return directory
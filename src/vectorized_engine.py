@@ -0,0 +1,152 @@
+import math
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from src.event_batch import DAY_US, EVENT_TYPES, EventBatch, to_epoch_us
+from src.models import InterestKind, UserEvent, UserInterest, UserProfile
+
+
+# Events older than this (or in the future) fall back to per-batch exp evaluation
+MAX_DECAY_TABLE_DAYS = 100_000
+
+
+def top_k_positions(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k largest scores, best first, in O(n + k log k).
+
+    Equal scores keep their original order, so the result matches a stable
+    descending sort truncated to k.
+    """
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        kth = np.partition(scores, n - k)[n - k]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)[:k - len(above)]
+        candidates = np.concatenate([above, ties])
+    else:
+        candidates = np.arange(n)
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+
+class VectorizedInterestScorer:
+    """Columnar variant of UserBehaviorAnalysisEngine.analyze_user_interests.
+
+    Works directly on an EventBatch, whose tags and tools are already integer
+    codes: weights and decays are computed as arrays in one pass and
+    per-item totals are aggregated with bincount. The produced UserProfile
+    matches the event-by-event implementation.
+    """
+
+    def __init__(
+        self,
+        event_weights: Dict[str, float],
+        time_decay_factor: float,
+        min_interactions: int,
+        max_top_items: int,
+    ):
+        self.event_weights = event_weights
+        self.time_decay_factor = time_decay_factor
+        self.min_interactions = min_interactions
+        self.max_top_items = max_top_items
+        self._decay_factors = np.empty(0, dtype=np.float64)
+        self.type_weights = np.array(
+            [self.event_weights.get(event_type, 1.0) for event_type in EVENT_TYPES], dtype=np.float64
+        )
+
+    def _decay_table(self, max_days: int) -> np.ndarray:
+        """exp(-factor * days) for days 0..max_days, grown on demand and shared by all calls."""
+        table = self._decay_factors
+        if len(table) <= max_days:
+            size = max(max_days + 1, 2 * len(table))
+            table = np.array([math.exp(-self.time_decay_factor * days) for days in range(size)], dtype=np.float64)
+            self._decay_factors = table
+        return table
+
+    def _decay(self, timestamps: np.ndarray, now: datetime) -> np.ndarray:
+        # Same whole-day floor as calculate_time_decay; exp is evaluated with
+        # math.exp per whole day so scores are bit-identical to the loop.
+        days_ago = (to_epoch_us(now) - timestamps) // DAY_US
+        if len(days_ago) and 0 <= days_ago.min() and days_ago.max() <= MAX_DECAY_TABLE_DAYS:
+            return self._decay_table(int(days_ago.max()))[days_ago]
+        unique_days, inverse = np.unique(days_ago, return_inverse=True)
+        factors = np.array(
+            [math.exp(-self.time_decay_factor * int(days)) for days in unique_days],
+            dtype=np.float64,
+        )
+        return factors[inverse.reshape(-1)]
+
+    def event_scores(self, batch: EventBatch, now: datetime) -> np.ndarray:
+        """Weight times time decay of every event in the batch."""
+        return self.type_weights[batch.event_types] * self._decay(batch.timestamps, now)
+
+    def _aggregate(
+        self, offsets: np.ndarray, codes: np.ndarray, weights: np.ndarray, size: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        positions = np.repeat(np.arange(len(weights), dtype=np.int64), np.diff(offsets))
+        scores = np.bincount(codes, weights=weights[positions], minlength=size)
+        counts = np.bincount(codes, minlength=size)
+        last_positions = np.full(size, -1, dtype=np.int64)
+        np.maximum.at(last_positions, codes, positions)
+        return scores, counts, last_positions
+
+    def _top_names(self, names: List[str], scores: np.ndarray, counts: np.ndarray) -> List[str]:
+        eligible = np.flatnonzero(counts >= self.min_interactions)
+        return [names[code] for code in eligible[top_k_positions(scores[eligible], self.max_top_items)].tolist()]
+
+    def _interests(
+        self,
+        names: List[str],
+        scores: np.ndarray,
+        counts: np.ndarray,
+        last_positions: np.ndarray,
+        batch: EventBatch,
+        kind: InterestKind,
+    ) -> List[UserInterest]:
+        return [
+            UserInterest(
+                tag_or_tool=name,
+                score=float(scores[code]),
+                interaction_count=int(counts[code]),
+                last_interaction=batch.timestamp_at(last_positions[code]),
+                kind=kind,
+            )
+            for code, name in enumerate(names)
+            if counts[code] >= self.min_interactions
+        ]
+
+    def analyze(
+        self, user_id: str, events: Union[List[UserEvent], EventBatch], now: Optional[datetime] = None
+    ) -> UserProfile:
+        batch = events if isinstance(events, EventBatch) else EventBatch.from_events(user_id, events)
+        return self.analyze_batch(user_id, batch, now)
+
+    def analyze_batch(self, user_id: str, batch: EventBatch, now: Optional[datetime] = None) -> UserProfile:
+        now = now or datetime.now()
+
+        weights = self.event_scores(batch, now)
+
+        tag_names = batch.tag_names
+        tool_names = batch.tool_names
+        tag_scores, tag_counts, tag_last = self._aggregate(batch.tag_offsets, batch.tag_codes, weights, len(tag_names))
+        tool_scores, tool_counts, tool_last = self._aggregate(batch.tool_offsets, batch.tool_codes, weights, len(tool_names))
+
+        interests = self._interests(tag_names, tag_scores, tag_counts, tag_last, batch, InterestKind.TAG)
+        interests += self._interests(tool_names, tool_scores, tool_counts, tool_last, batch, InterestKind.TOOL)
+        interests.sort(key=lambda x: x.score, reverse=True)
+
+        top_tags = self._top_names(tag_names, tag_scores, tag_counts)
+        top_tools = self._top_names(tool_names, tool_scores, tool_counts)
+
+        return UserProfile(
+            user_id=user_id,
+            email="",
+            name="",
+            total_events=len(batch),
+            interests=interests,
+            top_tags=top_tags,
+            top_tools=top_tools,
+            completed_tutorials=batch.completed_tutorial_ids(),
+        )
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+from src.analysis_engine import UserBehaviorAnalysisEngine
+from src.event_store import get_event_store
+from src.bulk_ingest import default_window, ingest_into_store
+from config.settings import settings
+
+
+def compact(event_store, days):
+    if days is None:
+        return 0
+    # Profiles read raw events unless they come from rollups; days before the window are never read
+    scored_from_rollups = settings.USE_DAILY_ROLLUPS and not settings.USE_INCREMENTAL_SCORES
+    if days < settings.MIXPANEL_DEFAULT_WINDOW_DAYS and not scored_from_rollups:
+        print(f"❌ Not compacting: profiles are scored from raw events of the last "
+              f"{settings.MIXPANEL_DEFAULT_WINDOW_DAYS} days. Enable USE_DAILY_ROLLUPS without "
+              f"USE_INCREMENTAL_SCORES, or pass --compact-older-than {settings.MIXPANEL_DEFAULT_WINDOW_DAYS}")
+        return 1
+    before_day = datetime.utcnow().date() - timedelta(days=days)
+    deleted = event_store.compact(before_day)
+    counts = event_store.row_counts()
+    print(f"🗜️  Compacted raw events before {before_day}: {deleted} deleted, "
+          f"{counts['events']} raw events and {counts['daily_rollups']} rollup rows left")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the local event store with missing days from Mixpanel")
+    parser.add_argument("--user", action="append", dest="users", help="Sync only this user (repeatable)")
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="Download one unfiltered export for the whole window instead of one export per user",
+    )
+    parser.add_argument(
+        "--compact-older-than",
+        type=int,
+        metavar="DAYS",
+        help="After syncing, drop raw events older than DAYS days and keep only their daily rollups",
+    )
+    args = parser.parse_args()
+
+    if not settings.MIXPANEL_API_SECRET:
+        print("❌ MIXPANEL_API_SECRET is not set")
+        return 1
+
+    engine = UserBehaviorAnalysisEngine()
+    if engine.event_store is None:
+        engine.event_store = get_event_store(settings.EVENT_STORE_DIR)
+
+    if args.bulk:
+        from_date, to_date = default_window()
+        written = ingest_into_store(engine.event_store, from_date, to_date)
+        print(f"✅ Bulk export {from_date}..{to_date}: {written} events written")
+        return compact(engine.event_store, args.compact_older_than)
+
+    user_ids = args.users or [user["user_id"] for user in engine.get_all_users_summary(settings.CSV_FILE_PATH)]
+
+    failed = 0
+    written = 0
+    for user_id in user_ids:
+        try:
+            written += engine.sync_user_events(user_id)
+        except Exception as e:
+            failed += 1
+            print(f"❌ {user_id}: {e}")
+
+    print(f"✅ Synced {len(user_ids) - failed}/{len(user_ids)} users, {written} events written")
+    return 1 if compact(engine.event_store, args.compact_older_than) or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
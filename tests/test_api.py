@@ -1,5 +1,6 @@
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
 
 BASE_URL = "http://localhost:8000"
 
@@ -92,6 +93,96 @@ def test_api():
     except Exception as e:
         print(f"❌ Error: {e}")
     
+    print("\n7. Testing cache invalidation...")
+    try:
+        test_user_id = "e15b0045-0001-4555-af6a-78a5530feca4"
+        response = requests.delete(f"{BASE_URL}/interests/{test_user_id}/cache")
+        if response.status_code == 200:
+            print(f"✅ Cache invalidated ({response.json()['invalidated_entries']} entries)")
+            stats = requests.get(f"{BASE_URL}/cache/stats").json()
+            print(f"   Hits: {stats['hits']}, misses: {stats['misses']}")
+        else:
+            print(f"❌ Error: {response.status_code}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+    
+    print("\n8. Testing batch interests...")
+    try:
+        test_user_ids = ["e15b0045-0001-4555-af6a-78a5530feca4", "unknown-user"]
+        response = requests.post(f"{BASE_URL}/interests/batch", json={"user_ids": test_user_ids}, stream=True)
+        if response.status_code == 200:
+            results = [json.loads(line) for line in response.iter_lines() if line]
+            errors = [result for result in results if "error" in result]
+            print(f"✅ Batch returned {len(results)} results ({len(errors)} errors)")
+        else:
+            print(f"❌ Error: {response.status_code}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+    
+    print("\n9. Testing top users for a tag...")
+    try:
+        response = requests.get(f"{BASE_URL}/tags/python/top-users", params={"limit": 5})
+        if response.status_code == 200:
+            print(f"✅ Top users for 'python': {len(response.json()['users'])}")
+        else:
+            print(f"❌ Error: {response.status_code}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+    
+    print("\n10. Testing metrics...")
+    try:
+        response = requests.get(f"{BASE_URL}/metrics")
+        if response.status_code == 200 and "engine_stage_duration_seconds" in response.text:
+            print("✅ Metrics exposed")
+            timing = requests.get(f"{BASE_URL}/interests/e15b0045-0001-4555-af6a-78a5530feca4").headers.get("Server-Timing")
+            print(f"   Server-Timing: {timing}")
+        else:
+            print(f"❌ Error: {response.status_code}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+    
+    print("\n11. Testing concurrent identical requests...")
+    try:
+        test_user_id = "e15b0045-0001-4555-af6a-78a5530feca4"
+        requests.delete(f"{BASE_URL}/interests/{test_user_id}/cache")
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            statuses = list(pool.map(lambda _: requests.get(f"{BASE_URL}/interests/{test_user_id}").status_code, range(10)))
+        if all(status == 200 for status in statuses):
+            shared = [line for line in requests.get(f"{BASE_URL}/metrics").text.splitlines()
+                      if line.startswith("single_flight_shared_total")]
+            print(f"✅ {len(statuses)} concurrent requests succeeded")
+            print(f"   {shared[0] if shared else 'single_flight_shared_total missing'}")
+        else:
+            print(f"❌ Error: {statuses}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+    
+    print("\n12. Testing recommendations...")
+    try:
+        test_user_id = "e15b0045-0001-4555-af6a-78a5530feca4"
+        response = requests.get(f"{BASE_URL}/recommendations/{test_user_id}", params={"limit": 5})
+        if response.status_code == 200:
+            data = response.json()
+            print(f"✅ Recommended {len(data['recommendations'])} tutorials ({data['excluded_completed']} completed excluded)")
+            for recommendation in data["recommendations"][:3]:
+                print(f"   {recommendation['tutorial']['title']}: {recommendation['score']:.2f}")
+        else:
+            print(f"❌ Error: {response.status_code}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+    
+    print("\n13. Testing cohort analytics...")
+    try:
+        response = requests.get(f"{BASE_URL}/analytics/cohort", params={"active_days": 30, "top_n": 5})
+        if response.status_code == 200:
+            data = response.json()
+            print(f"✅ Cohort of {data['matched_users']} of {data['total_users']} users")
+            print(f"   Top tags: {[item['name'] for item in data['top_tags']]}")
+        else:
+            print(f"❌ Error: {response.status_code}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+    
     print("\n" + "=" * 50)
     print("🎉 Testing completed!")
 